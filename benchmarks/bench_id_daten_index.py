@@ -0,0 +1,91 @@
+"""
+Compare the per-element get_inverse() lookup of ID-Daten psets with the
+single-pass property index used by extract_id_daten_filtered.
+
+    python benchmarks/bench_id_daten_index.py --products 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifcopenshell  # noqa: E402
+
+import checker  # noqa: E402
+from synthetic_ifc import write_synthetic_ifc  # noqa: E402
+
+def read_id_daten_inverse(model, elem):
+    """The previous lookup: walk every inverse relation of one element."""
+    out = {}
+    for rel in model.get_inverse(elem):
+        if rel.is_a("IfcRelDefinesByProperties"):
+            pdef = rel.RelatingPropertyDefinition
+            if pdef.is_a("IfcPropertySet") and (pdef.Name or "").strip().lower() == "id-daten":
+                out.update(checker._id_daten_props(pdef))
+    return out
+
+def _matching_products(model):
+    out = []
+    for e in model.by_type("IfcProduct"):
+        low = (getattr(e, "Name", "") or "").lower()
+        if any(sub.lower() in low for tgt in checker.TARGETS for sub in tgt["match"]):
+            out.append(e)
+    return out
+
+def bench_inverse(model, products):
+    return {e.id(): read_id_daten_inverse(model, e) for e in products}
+
+def bench_index(model, products):
+    index = checker.build_id_daten_index(model)
+    return {e.id(): index.get(e.id(), {}) for e in products}
+
+def _timed(fn, *args, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, result
+
+def run():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--products", type=int, default=50_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--file", help="use an existing IFC instead of a synthetic one")
+    args = ap.parse_args()
+
+    path = args.file
+    tmpdir = None
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "synthetic.ifc")
+        n = write_synthetic_ifc(path, args.products, shared_pset_every=7)
+        print(f"synthetic model: {args.products} products, {n} instances, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+    t0 = time.perf_counter()
+    model = ifcopenshell.open(path)
+    print(f"ifcopenshell.open:      {time.perf_counter() - t0:8.3f} s")
+
+    products = _matching_products(model)
+    print(f"matching products:      {len(products):8d}")
+
+    t_old, old = _timed(bench_inverse, model, products, repeat=args.repeat)
+    t_new, new = _timed(bench_index, model, products, repeat=args.repeat)
+    assert old == new, "index and get_inverse lookups disagree"
+
+    print(f"get_inverse per element: {t_old:8.3f} s")
+    print(f"single-pass index:       {t_new:8.3f} s  ({t_old / t_new:.1f}x)")
+
+    t_full, _ = _timed(checker.extract_id_daten_filtered, path, repeat=1)
+    print(f"extract_id_daten_filtered (incl. open): {t_full:.3f} s")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+if __name__ == "__main__":
+    run()
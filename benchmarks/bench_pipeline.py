@@ -0,0 +1,222 @@
+"""
+End-to-end benchmark of the check pipeline on synthetic IFC models.
+
+Every stage is timed and memory-profiled on its own, for each model size:
+ifcopenshell.open, ID-Daten extraction (plus the streaming extractor), rule
+checks, the detailed table and the PDF report. Runs offline with fixed
+standards, so numbers only change when the code (or the machine) does.
+
+    python benchmarks/bench_pipeline.py --sizes 1000,10000,50000
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/<older>.json
+
+Results are written as JSON (default benchmarks/results/<commit>.json). With
+--compare, stages that got slower than --threshold times the older run are
+listed and the exit code is 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ifcopenshell  # noqa: E402
+
+import checker  # noqa: E402
+import report  # noqa: E402
+from synthetic_ifc import write_synthetic_ifc  # noqa: E402
+
+# Limits inside the generator's value ranges, so the checks produce ✓ and ✗
+BENCH_STANDARDS = {
+    "Breite (m)": 1.2,
+    "Länge (m)": 6.0,
+    "Neigung (%)": 6.0,
+    "Spurbreite (m)": 1.435,
+    "Längsneigung (%)": 2.5,
+    "Bahnsteighöhe min (m)": 0.55,
+    "Bahnsteighöhe max (m)": 0.76,
+    "Abstand Gleismitte (m)": 3.0,
+    "_sources": {},
+    "_ops": {"Bahnsteighöhe (m)": "range"},
+    "_ranges": {},
+}
+
+STAGES = ("open", "extract", "extract_streaming", "check", "flatten", "pdf")
+
+def _rss_mb():
+    """Current resident set size (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError):
+        return None
+
+def measure(fn, *args, repeat=1, memory=True):
+    """
+    (result, stats) for fn(*args): best and all wall times of `repeat` runs,
+    RSS after the first run, and the peak of Python allocations in one extra
+    traced run. tracemalloc slows code down, so it never overlaps the timing;
+    it also doesn't see ifcopenshell's C++ heap, hence the RSS figure.
+    """
+    times, result, rss = [], None, None
+    for i in range(repeat):
+        result = None
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - t0)
+        if i == 0:
+            rss = _rss_mb()
+    stats = {"seconds": round(min(times), 4), "runs": [round(t, 4) for t in times], "rss_mb": rss and round(rss, 1)}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn(*args)
+        stats["py_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return result, stats
+
+def _pdf_size(payload, mode):
+    return len(report._generate_results_pdf_report(payload, mode=mode).getvalue())
+
+def bench_size(n_products, workdir, repeat=1, memory=True, report_mode="full", pdf_max_rows=None):
+    """Generate a model with n_products target products and run every stage on it."""
+    path = os.path.join(workdir, f"synthetic-{n_products}.ifc")
+    instances = write_synthetic_ifc(path, n_products, shared_pset_every=7)
+    run = {"products": n_products, "instances": instances,
+           "file_mb": round(os.path.getsize(path) / 1e6, 2), "stages": {}}
+    stages = run["stages"]
+
+    model, stages["open"] = measure(ifcopenshell.open, path, repeat=repeat, memory=memory)
+    rows, stages["extract"] = measure(checker.extract_id_daten_from_model, model, repeat=repeat, memory=memory)
+    del model
+    gc.collect()
+    streamed, stages["extract_streaming"] = measure(checker.extract_id_daten_streaming, path,
+                                                    repeat=repeat, memory=memory)
+    if streamed != rows:
+        raise AssertionError("streaming and ifcopenshell extraction disagree")
+    del streamed
+    run["rows"] = len(rows)
+
+    standards = BENCH_STANDARDS
+    ops, ranges = standards["_ops"], standards["_ranges"]
+
+    def check(rows):
+        return checker.check_rows(rows, standards, checker.compile_rules(standards))
+
+    rows, stages["check"] = measure(check, rows, repeat=repeat, memory=memory)
+    total, ok, fail, missing = checker._collect_summary(rows)
+    run["summary"] = {"total": total, "ok": ok, "fail": fail, "missing": missing}
+
+    table, stages["flatten"] = measure(checker._flatten_rows_for_detailed_table, rows, standards, ops, ranges,
+                                       repeat=repeat, memory=memory)
+    run["table_lines"] = len(table)
+    del table
+
+    if pdf_max_rows is not None and len(rows) > pdf_max_rows:
+        stages["pdf"] = None
+    else:
+        payload = {"rows": rows, "standards": standards, "_ops": ops, "_ranges": ranges}
+        size, stages["pdf"] = measure(_pdf_size, payload, report_mode, repeat=repeat, memory=memory)
+        run["pdf_mb"] = round(size / 1e6, 2)
+    os.remove(path)
+    return run
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def compare(old, new, threshold, min_seconds=0.01):
+    """
+    Print old vs. new seconds per size and stage; returns the regressions.
+    Stages faster than min_seconds are too noisy to count as one.
+    """
+    old_runs = {r["products"]: r for r in old["runs"]}
+    regressions = []
+    print(f"\ncompared with {old['meta'].get('commit') or '?'} ({old['meta'].get('timestamp')})")
+    for run in new["runs"]:
+        before = old_runs.get(run["products"])
+        if not before:
+            continue
+        for stage in STAGES:
+            a, b = before["stages"].get(stage), run["stages"].get(stage)
+            if not a or not b:
+                continue
+            ratio = b["seconds"] / a["seconds"] if a["seconds"] else float("inf")
+            flag = ""
+            if ratio > threshold and b["seconds"] >= min_seconds:
+                flag = "  <-- slower"
+                regressions.append((run["products"], stage, ratio))
+            print(f"{run['products']:>9d} {stage:18s} {a['seconds']:9.3f} s -> {b['seconds']:9.3f} s  {ratio:5.2f}x{flag}")
+    return regressions
+
+def run():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", default="1000,10000", help="comma separated product counts (default: 1000,10000)")
+    ap.add_argument("--repeat", type=int, default=1, help="timed runs per stage, the best one counts")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    ap.add_argument("--report-mode", default="full", choices=report.REPORT_MODES)
+    ap.add_argument("--pdf-max-rows", type=int, help="skip the PDF stage for results with more rows")
+    ap.add_argument("--out", help="JSON file for the results (default: benchmarks/results/<commit>.json)")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=1.25, help="slowdown factor reported as regression")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    commit = _git_commit()
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ifcopenshell": ifcopenshell.version,
+            "repeat": args.repeat,
+            "report_mode": args.report_mode,
+        },
+        "runs": [],
+    }
+
+    print(f"{'products':>9s} {'stage':18s} {'seconds':>9s} {'py peak':>10s} {'rss':>10s}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            res = bench_size(n, workdir, repeat=args.repeat, memory=not args.no_memory,
+                             report_mode=args.report_mode, pdf_max_rows=args.pdf_max_rows)
+            result["runs"].append(res)
+            for stage in STAGES:
+                st = res["stages"].get(stage)
+                if st is None:
+                    print(f"{n:>9d} {stage:18s} {'skipped':>9s}")
+                    continue
+                peak = f"{st['py_peak_mb']:7.1f} MB" if "py_peak_mb" in st else ""
+                rss = f"{st['rss_mb']:7.1f} MB" if st["rss_mb"] is not None else ""
+                print(f"{n:>9d} {stage:18s} {st['seconds']:9.3f} {peak:>10s} {rss:>10s}")
+            print(f"{'':9s} {res['rows']} rows, {res['file_mb']} MB IFC, {res['instances']} instances")
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results",
+                                   f"{commit or time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nwritten to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,76 @@
+"""
+Time the PDF report for a synthetic checked result of N rows.
+
+    python benchmarks/bench_report.py --rows 50000 --mode full --out /tmp/report.pdf
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import checker  # noqa: E402
+import report  # noqa: E402
+
+# IFC class per TARGETS short, the same ones synthetic_ifc.py writes
+IFC_TYPES = {
+    "Schwelle": "IfcBuildingElementProxy",
+    "Schiene": "IfcMember",
+    "Bahnsteig": "IfcSlab",
+    "Mast": "IfcBuildingElementProxy",
+    "Rampe": "IfcRamp",
+}
+
+def synthetic_payload(n_rows, seed=42):
+    """Rows shaped like run_check_pipeline output, checked against the current standards."""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        tgt = checker.TARGETS[i % len(checker.TARGETS)]
+        vals = {}
+        for label in tgt["keys"]:
+            r = rnd.random()
+            vals[label] = None if r < 0.1 else round(rnd.uniform(0, 2000), 1)
+        rows.append({
+            "Short": tgt["short"],
+            "IfcType": IFC_TYPES.get(tgt["short"], "IfcBuildingElementProxy"),
+            "GlobalId": f"{i:022d}",
+            "Name": f"{tgt['short']} {i}",
+            "Values": vals,
+        })
+    standards = checker.read_standards(os.path.join("uploads", "ifc", "standards.json"))
+    # give every attribute without a configured limit one, so the table has ✓ and ✗
+    for tgt in checker.TARGETS:
+        for label in tgt["keys"]:
+            if standards.get(label) is None and label not in standards["_ops"]:
+                standards[label] = 1000
+                standards["_ops"][label] = "<="
+    rows = checker.check_rows(rows, standards)
+    return {
+        "rows": rows,
+        "standards": standards,
+        "_ops": standards.get("_ops", {}) or {},
+        "_ranges": standards.get("_ranges", {}) or {},
+    }
+
+def run():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--mode", default="full", choices=report.REPORT_MODES)
+    ap.add_argument("--out", help="also write the PDF here")
+    args = ap.parse_args()
+
+    payload = synthetic_payload(args.rows)
+    t0 = time.perf_counter()
+    buf = report._generate_results_pdf_report(payload, mode=args.mode)
+    dt = time.perf_counter() - t0
+    data = buf.getvalue()
+    print(f"rows: {args.rows}  mode: {args.mode}  pdf: {len(data) / 1e6:.1f} MB  render: {dt:.2f} s")
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(data)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,43 @@
+"""
+Compare the prompt context of the "full" and "retrieval" AI context modes
+for every checked attribute, on a source PDF or text file.
+
+    python benchmarks/bench_retrieval.py path/to/Ril813.pdf
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+def run():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("source", help="PDF or plain-text file")
+    ap.add_argument("--show", action="store_true", help="print the retrieved context")
+    args = ap.parse_args()
+
+    if args.source.lower().endswith(".pdf"):
+        text = main._pdf_extract_text_bounded(args.source)
+    else:
+        with open(args.source, "r", encoding="utf-8") as f:
+            text = f.read()[:200_000]
+    print(f"source text: {len(text)} chars")
+
+    t0 = time.perf_counter()
+    main._bm25_index(text)
+    print(f"index build (or load): {time.perf_counter() - t0:.3f} s\n")
+
+    labels = [label for tgt in main.TARGETS for label in tgt["keys"]]
+    print(f"{'attribute':28s} {'full':>9s} {'retrieval':>10s} {'ratio':>7s}")
+    for label in labels:
+        full = main._context_for_attr(label, text, mode="full")
+        retrieved = main._context_for_attr(label, text, mode="retrieval")
+        print(f"{label:28s} {len(full):9d} {len(retrieved):10d} {len(full) / max(1, len(retrieved)):6.1f}x")
+        if args.show:
+            print(retrieved, "\n" + "-" * 60)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,124 @@
+"""
+Synthetic IFC-SPF generator for benchmarks.
+
+Writes a plain IFC4 STEP file with N products whose names hit the TARGETS
+patterns (plus some noise products), each carrying an "ID-Daten" property set.
+The file is written line by line so very large models can be produced without
+holding them in memory.
+"""
+import random
+
+# (product name, IFC entity, {ID-Daten property: (IFC value type, low, high)})
+PRODUCT_KINDS = [
+    ("Rampe:Rampe max.100%:1274060:1", "IFCRAMP", {
+        "Breite": ("IFCLENGTHMEASURE", 0.9, 1.8),
+        "Länge": ("IFCLENGTHMEASURE", 2.0, 12.0),
+        "Neigung": ("IFCREAL", 2.0, 10.0),
+    }),
+    ("Schwelle B70", "IFCBUILDINGELEMENTPROXY", {
+        "Spurbreite": ("IFCLENGTHMEASURE", 1.430, 1.440),
+    }),
+    ("Schiene 12210", "IFCMEMBER", {
+        "Längsneigung": ("IFCREAL", 0.0, 4.0),
+    }),
+    ("ice DB_BSK_76_Pass:ProVI DB_BSK_76_Pass 0.7368:1030184", "IFCSLAB", {
+        "Bahnsteighöhe": ("IFCLENGTHMEASURE", 0.55, 0.96),
+    }),
+    ("ice DB_Beleuchtungsmast_1_einseitig", "IFCBUILDINGELEMENTPROXY", {
+        "Abstand_Gleismitte": ("IFCLENGTHMEASURE", 2.5, 4.0),
+    }),
+]
+NOISE_KINDS = [
+    ("Wand 24cm", "IFCWALL"),
+    ("Fundament F1", "IFCFOOTING"),
+]
+
+_GUID_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$"
+
+def _step_str(text):
+    """Encode a Python string as a STEP string literal (\\X2\\ for non-ASCII)."""
+    out = []
+    for ch in text:
+        if ch == "'":
+            out.append("''")
+        elif ch == "\\":
+            out.append("\\\\")
+        elif ord(ch) < 128:
+            out.append(ch)
+        else:
+            out.append("\\X2\\%04X\\X0\\" % ord(ch))
+    return "'" + "".join(out) + "'"
+
+def _guid(rng):
+    return "".join(rng.choice(_GUID_CHARS) for _ in range(22))
+
+def write_synthetic_ifc(path, n_products, seed=42, noise_ratio=0.1, shared_pset_every=0, extra_psets=4):
+    """
+    Write an IFC4 model with `n_products` target products to `path`.
+
+    noise_ratio        -- additional fraction of products that match no target
+    shared_pset_every  -- if > 0, every k-th product reuses the previous ID-Daten pset
+    extra_psets        -- foreign psets per product (authoring tools export many)
+    Returns the number of entity instances written.
+    """
+    rng = random.Random(seed)
+    n_noise = int(n_products * noise_ratio)
+    next_id = [1]
+
+    def new_id():
+        i = next_id[0]
+        next_id[0] += 1
+        return i
+
+    with open(path, "w", encoding="ascii", newline="\n") as f:
+        f.write("ISO-10303-21;\nHEADER;\n")
+        f.write("FILE_DESCRIPTION(('ViewDefinition [ReferenceView]'),'2;1');\n")
+        f.write("FILE_NAME('synthetic.ifc','2025-01-01T00:00:00',(''),(''),'','','');\n")
+        f.write("FILE_SCHEMA(('IFC4'));\nENDSEC;\nDATA;\n")
+
+        project = new_id()
+        f.write(f"#{project}=IFCPROJECT({_step_str(_guid(rng))},$,'Synthetic',$,$,$,$,$,$);\n")
+
+        last_pset = None
+        for i in range(n_products + n_noise):
+            if i < n_products:
+                name, entity, props = PRODUCT_KINDS[i % len(PRODUCT_KINDS)]
+            else:
+                name, entity = NOISE_KINDS[i % len(NOISE_KINDS)]
+                props = {"Material": ("IFCLABEL", None, None)}
+
+            pid = new_id()
+            f.write(f"#{pid}={entity}({_step_str(_guid(rng))},$,{_step_str(name)},$,$,$,$,$,$);\n")
+
+            if shared_pset_every and last_pset and i % shared_pset_every == 0:
+                pset = last_pset
+            else:
+                prop_ids = []
+                for pname, (vtype, lo, hi) in props.items():
+                    prid = new_id()
+                    if vtype == "IFCLABEL":
+                        val = f"IFCLABEL({_step_str('Beton')})"
+                    else:
+                        val = f"{vtype}({rng.uniform(lo, hi):.4f})"
+                    f.write(f"#{prid}=IFCPROPERTYSINGLEVALUE({_step_str(pname)},$,{val},$);\n")
+                    prop_ids.append(prid)
+                pset = new_id()
+                refs = ",".join(f"#{p}" for p in prop_ids)
+                f.write(f"#{pset}=IFCPROPERTYSET({_step_str(_guid(rng))},$,'ID-Daten',$,({refs}));\n")
+                last_pset = pset
+
+            # unrelated psets, so lookups have to skip foreign definitions
+            for k in range(extra_psets):
+                other_prop = new_id()
+                f.write(f"#{other_prop}=IFCPROPERTYSINGLEVALUE('Status',$,IFCLABEL('neu'),$);\n")
+                other = new_id()
+                f.write(f"#{other}=IFCPROPERTYSET({_step_str(_guid(rng))},$,'Pset_Common_{k}',$,(#{other_prop}));\n")
+                rel = new_id()
+                f.write(f"#{rel}=IFCRELDEFINESBYPROPERTIES({_step_str(_guid(rng))},$,$,$,(#{pid}),#{other});\n")
+
+            rel = new_id()
+            f.write(f"#{rel}=IFCRELDEFINESBYPROPERTIES({_step_str(_guid(rng))},$,$,$,(#{pid}),#{pset});\n")
+
+        f.write("ENDSEC;\nEND-ISO-10303-21;\n")
+
+    return next_id[0] - 1
@@ -0,0 +1,924 @@
+"""
+IFC check pipeline without the web app: ID-Daten extraction, standards, rule
+checks and the table helpers shared by the web app, the PDF report and cli.py.
+Imports neither Flask nor the OpenAI client, so worker processes and the CLI
+stay light.
+"""
+import os, json, hashlib, gzip, tempfile, zlib
+import re
+from functools import lru_cache
+import ifcopenshell
+import numpy as np
+
+import metrics
+
+EXTRACT_CACHE_FOLDER = 'extract_cache'  # extracted rows keyed by upload hash + TARGETS
+
+# Files at least this large (MB) are extracted with the streaming STEP reader
+# instead of ifcopenshell.open; 0 disables streaming.
+IFC_STREAMING_MIN_MB = float(os.getenv("IFC_STREAMING_MIN_MB", "0") or 0)
+# Size cap of the extraction cache; least recently used entries go first.
+EXTRACT_CACHE_MAX_MB = float(os.getenv("EXTRACT_CACHE_MAX_MB", "512") or 0)
+# Bump when extraction output changes so stale cache entries are ignored.
+EXTRACT_VERSION = 1
+
+# -----------------------------
+# Detection config
+# -----------------------------
+TARGETS = [
+    {
+        "match": ["Schwelle"],
+        "short": "Schwelle",
+        "keys": {"Spurbreite (m)": ["Spurbreite", "Spurbereite"]},
+    },
+    {
+        "match": ["Schiene 12210", "Schiene"],
+        "short": "Schiene",
+        "keys": {"Längsneigung (%)": ["Längsneigung", "Laengsneigung", "Neigung längs", "Neigung laengs"]},
+    },
+    {
+        "match": ["ice DB_BSK_76_Pass:ProVI DB_BSK_76_Pass 0.7368:1030184", "Bahnsteig"],
+        "short": "Bahnsteig",
+        "keys": {"Bahnsteighöhe (m)": ["Bahnsteigshöhe", "Bahnsteig_hoehe", "Bahnsteig Höhe", "Bahnsteighöhe"]},
+    },
+    {
+        "match": ["ice DB_Beleuchtungsmast_1_einseitig", "Beleuchtungsmast", "Mast"],
+        "short": "Mast",
+        "keys": {"Abstand Gleismitte (m)": ["Abstand_Gleismitte", "Abstand Gleismitte", "Gleismitte Abstand"]},
+    },
+    {
+        "match": ["Rampe:Rampe max.100%:1274060:1", "Rampe"],
+        "short": "Rampe",
+        "keys": {
+            "Breite (m)": ["Breite"],
+            "Länge (m)": ["Länge", "Laenge"],
+            "Neigung (%)": ["Neigung"],
+        },
+    },
+]
+
+TARGET_MATCH_CACHE_SIZE = 65_536   # memoized product names -> target
+
+def targets_fingerprint(targets=None):
+    """Stable hash of the detection config; changes whenever TARGETS changes."""
+    raw = json.dumps(TARGETS if targets is None else targets, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def compile_target_matcher(targets):
+    """
+    Compile all "match" substrings into one regex and return match(name) ->
+    index into targets (or None). Every pattern sits in a zero-width lookahead,
+    grouped per target in priority order, so at each position the engine reports
+    the first target with a pattern starting there; the smallest index over all
+    positions wins, which is the old first-target-wins loop. Results are memoized
+    per name since models repeat the same family names many times.
+    """
+    groups = []
+    for tgt in targets:
+        pats = sorted({sub.lower() for sub in tgt["match"]}, key=len, reverse=True)
+        groups.append("(" + "|".join(re.escape(p) for p in pats) + ")" if pats else "(?!)")
+    if not groups:
+        return lambda name: None
+    rx = re.compile("(?=" + "|".join(groups) + ")")
+
+    @lru_cache(maxsize=TARGET_MATCH_CACHE_SIZE)
+    def match(name):
+        best = None
+        for m in rx.finditer(name.lower()):
+            idx = m.lastindex - 1
+            if best is None or idx < best:
+                best = idx
+                if idx == 0:
+                    break
+        return best
+
+    return match
+
+_target_matcher = {"fingerprint": None, "match": None}
+
+def get_target_matcher():
+    """Compiled matcher for the current TARGETS; recompiled only when they change."""
+    fp = targets_fingerprint()
+    if _target_matcher["fingerprint"] != fp:
+        _target_matcher["match"] = compile_target_matcher(TARGETS)
+        _target_matcher["fingerprint"] = fp
+    return _target_matcher["match"]
+
+get_target_matcher()
+
+# -----------------------------
+# Disk cache (gzipped JSON, LRU by mtime)
+# -----------------------------
+def _cache_file(folder, key):
+    return os.path.join(folder, f"{key}.json.gz")
+
+def _cache_get_json(folder, key):
+    path = _cache_file(folder, key)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        os.utime(path)  # mark as recently used
+        return data
+    except (OSError, ValueError):
+        return None
+
+def _cache_put_json(folder, key, data, max_bytes=None):
+    """Write atomically (temp file + rename), then trim the folder to max_bytes."""
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=5) as gz:
+            gz.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        os.replace(tmp, _cache_file(folder, key))
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return
+    if max_bytes:
+        _cache_evict_lru(folder, max_bytes)
+
+def _cache_evict_lru(folder, max_bytes):
+    entries = []
+    total = 0
+    for entry in os.scandir(folder):
+        if not entry.is_file() or entry.name.endswith(".tmp"):
+            continue
+        st = entry.stat()
+        entries.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+# -----------------------------
+# Standards file
+# -----------------------------
+def _read_standards_file(raw: bytes | None):
+    defaults = {
+        "Breite (m)": None,
+        "Länge (m)": None,
+        "Neigung (%)": None,
+        "Spurbreite (m)": None,
+        "Längsneigung (%)": None,
+        "Bahnsteighöhe min (m)": None,
+        "Bahnsteighöhe max (m)": None,
+        "Abstand Gleismitte (m)": None,
+        "_sources": {},  # attribute -> {"link": str|None, "file": filename|None}
+        "_ops": {},
+        "_ranges": {}
+    }
+    if raw:
+        try:
+            data = json.loads(raw.decode("utf-8"))
+            if "_sources" not in data:
+                data["_sources"] = {}
+            if "_ops" not in data:
+                data["_ops"] = {}
+            defaults.update(data or {})
+        except Exception:
+            pass
+    return defaults
+
+def read_standards(path):
+    """standards.json at path with the defaults applied (all defaults if it does not exist)."""
+    try:
+        with open(path, "rb") as f:
+            return _read_standards_file(f.read())
+    except FileNotFoundError:
+        return _read_standards_file(None)
+
+# -----------------------------
+# Extraction (ifcopenshell)
+# -----------------------------
+def _id_daten_props(pset):
+    """Resolve the single values of an ID-Daten pset into {name: value}."""
+    out = {}
+    for prop in pset.HasProperties or []:
+        try:
+            val = prop.NominalValue.wrappedValue
+        except Exception:
+            val = None
+        if isinstance(val, (int, float)):
+            val = round(float(val), 2)
+        out[prop.Name] = val
+    return out
+
+def build_id_daten_index(model):
+    """
+    Build {element id: {prop name: value}} for all "ID-Daten" property sets in
+    one sweep over the model's psets. Only ID-Daten psets are resolved (and only
+    once, even if shared); their IfcRelDefinesByProperties give the elements.
+    """
+    index = {}
+    for pset in model.by_type("IfcPropertySet"):
+        if (pset.Name or "").strip().lower() != "id-daten":
+            continue
+        props = None
+        for rel in model.get_inverse(pset):
+            if not rel.is_a("IfcRelDefinesByProperties"):
+                continue
+            if props is None:
+                props = _id_daten_props(pset)
+            for obj in rel.RelatedObjects or []:
+                entry = index.get(obj.id())
+                if entry is None:
+                    index[obj.id()] = dict(props)
+                else:
+                    entry.update(props)
+    return index
+
+def extract_id_daten_filtered(filepath):
+    with metrics.span("ifc_open"):
+        model = ifcopenshell.open(filepath)
+    with metrics.span("extract"):
+        return extract_id_daten_from_model(model)
+
+def extract_id_daten_from_model(model):
+    """Rows of all target products with at least one ID-Daten value, from an opened model."""
+    results = []
+    id_daten = build_id_daten_index(model)
+
+    match_target = get_target_matcher()
+
+    for e in model.by_type("IfcProduct"):
+        name = (getattr(e, "Name", "") or "")
+        idx = match_target(name)
+        if idx is None:
+            continue
+        tgt = TARGETS[idx]
+
+        id_daten_raw = id_daten.get(e.id(), {})
+        filtered = {}
+        for col_label, candidates in tgt["keys"].items():
+            val = None
+            for c in candidates:
+                if c in id_daten_raw and id_daten_raw[c] is not None:
+                    val = id_daten_raw[c]
+                    break
+            filtered[col_label] = val
+
+        has_value = any(v is not None for v in filtered.values())
+        if not has_value:
+            continue
+
+        results.append({
+            "Short": tgt["short"],
+            "IfcType": e.is_a(),
+            "GlobalId": e.GlobalId,
+            "Name": name,
+            "Values": filtered,
+        })
+
+    return results
+
+# -----------------------------
+# Streaming extraction (IFC-SPF text, bounded memory)
+# -----------------------------
+_STEP_RECORD_HEAD = re.compile(r"#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*\(")
+_STEP_STATEMENT_DELIM = re.compile(r"'|/\*|;")
+_STEP_TOKEN = re.compile(r"""\s*(?:
+    (?P<str>'(?:[^']|'')*')
+  | \#(?P<ref>\d+)
+  | \.(?P<enum>[A-Za-z0-9_]+)\.
+  | (?P<num>[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<typed>[A-Za-z][A-Za-z0-9_]*)\s*\(
+  | (?P<open>\()
+  | (?P<close>\))
+  | (?P<null>[$*])
+  | (?P<bin>"[0-9A-Fa-f]*")
+  | (?P<comma>,)
+)""", re.X)
+_STEP_STRING_ESCAPE = re.compile(r"\\X2\\((?:[0-9A-Fa-f]{4})*)\\X0\\|\\X4\\((?:[0-9A-Fa-f]{8})*)\\X0\\"
+                                 r"|\\X\\([0-9A-Fa-f]{2})|\\S\\(.)|\\P[A-I]\\|\\\\")
+
+def _decode_step_string(raw: str) -> str:
+    """Decode a STEP string literal body ('' quotes and \\X2\\, \\X4\\, \\X\\, \\S\\ escapes)."""
+    raw = raw.replace("''", "'")
+    if not raw.isascii():
+        raw = raw.encode("ascii", "ignore").decode("ascii")  # ifcopenshell drops raw 8-bit bytes too
+    if "\\" not in raw:
+        return raw
+
+    def _sub(m):
+        if m.group(1) is not None:
+            h = m.group(1)
+            return "".join(chr(int(h[i:i + 4], 16)) for i in range(0, len(h), 4))
+        if m.group(2) is not None:
+            h = m.group(2)
+            return "".join(chr(int(h[i:i + 8], 16)) for i in range(0, len(h), 8))
+        if m.group(3) is not None:
+            return chr(int(m.group(3), 16))
+        if m.group(4) is not None:
+            return chr(ord(m.group(4)) + 128)
+        if m.group(0) == "\\\\":
+            return "\\"
+        return ""  # \PA\ … code page switches carry no text
+
+    return _STEP_STRING_ESCAPE.sub(_sub, raw)
+
+def _parse_step_args(text: str, pos: int):
+    """
+    Parse the argument list starting right after the entity's "(".
+    Returns a list; refs are ("#", id), enums ("." , name), typed values
+    (TYPE, [args]), strings str, numbers int/float, $ and * None.
+    """
+    stack = [[]]
+    n = len(text)
+    while pos < n:
+        m = _STEP_TOKEN.match(text, pos)
+        if not m:
+            raise ValueError(f"unexpected STEP token at {pos}: {text[pos:pos + 20]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "comma":
+            continue
+        if kind == "close":
+            done = stack.pop()
+            if not stack:
+                return done
+            if isinstance(stack[-1], tuple):
+                typed = stack.pop()
+                stack[-1].append((typed[0], done))
+            else:
+                stack[-1].append(done)
+        elif kind == "open":
+            stack.append([])
+        elif kind == "typed":
+            stack.append((m.group("typed").upper(),))
+            stack.append([])
+        elif kind == "str":
+            stack[-1].append(_decode_step_string(m.group("str")[1:-1]))
+        elif kind == "ref":
+            stack[-1].append(("#", int(m.group("ref"))))
+        elif kind == "enum":
+            stack[-1].append((".", m.group("enum").upper()))
+        elif kind == "num":
+            tok = m.group("num")
+            stack[-1].append(float(tok) if any(c in tok for c in ".eE") else int(tok))
+        elif kind == "null":
+            stack[-1].append(None)
+        else:  # binary
+            stack[-1].append(m.group("bin")[1:-1])
+    raise ValueError("unterminated STEP record")
+
+def _iter_step_statements(fp):
+    """
+    Yield every ';'-terminated statement of an IFC-SPF file, stripped and with
+    comments removed. ';' and '/*' only count outside string literals, so
+    several records per line and records spanning lines both come out whole.
+    """
+    buf = []
+    in_str = in_comment = False
+    for line in fp:
+        # usual case: one record per line, no comment, quotes balanced
+        if not (in_str or in_comment) and line.count(";") == 1 and line.rstrip().endswith(";") \
+                and "/*" not in line and not line.count("'") % 2:
+            buf.append(line.rstrip()[:-1])
+            yield "".join(buf).strip()
+            buf = []
+            continue
+        pos, n = 0, len(line)
+        while pos < n:
+            if in_comment:
+                end = line.find("*/", pos)
+                if end < 0:
+                    break
+                pos, in_comment = end + 2, False
+            elif in_str:
+                # a doubled '' closes and reopens the literal, which keeps it intact
+                end = line.find("'", pos)
+                if end < 0:
+                    buf.append(line[pos:])  # ifcopenshell keeps line breaks inside strings too
+                    break
+                buf.append(line[pos:end + 1])
+                pos, in_str = end + 1, False
+            else:
+                m = _STEP_STATEMENT_DELIM.search(line, pos)
+                if not m:
+                    buf.append(line[pos:])
+                    break
+                buf.append(line[pos:m.start()])
+                pos = m.end()
+                if m.group() == "'":
+                    buf.append("'")
+                    in_str = True
+                elif m.group() == "/*":
+                    in_comment = True
+                else:
+                    yield "".join(buf).strip()
+                    buf = []
+
+def _iter_step_records(fp):
+    """Yield (id, TYPE, text, args_pos) for every instance in the DATA section."""
+    in_data = False
+    for text in _iter_step_statements(fp):
+        head = text[:6].upper()
+        if not in_data:
+            in_data = head == "DATA" or head.startswith("DATA(")
+            continue
+        if head.startswith("ENDSEC"):
+            return
+        m = _STEP_RECORD_HEAD.match(text)
+        if m:
+            yield int(m.group(1)), m.group(2).upper(), text, m.end()
+
+def _step_schema_name(filepath):
+    with open(filepath, "r", encoding="latin-1") as fp:
+        for text in _iter_step_statements(fp):
+            m = re.match(r"FILE_SCHEMA\s*\(\s*\(\s*'([^']+)'", text, re.I)
+            if m:
+                return m.group(1).upper()
+            if text.upper().startswith("DATA"):
+                break
+    return "IFC4"
+
+@lru_cache(maxsize=8)
+def _product_types(schema_name):
+    """{UPPERCASE entity name: (schema name, schema index)} for IfcProduct subtypes."""
+    from ifcopenshell import ifcopenshell_wrapper
+    try:
+        schema = ifcopenshell_wrapper.schema_by_name(schema_name)
+    except Exception:
+        schema = ifcopenshell_wrapper.schema_by_name(schema_name.split("_")[0])
+    out = {}
+    for decl in schema.entities():
+        sup = decl
+        while sup is not None and sup.name() != "IfcProduct":
+            sup = sup.supertype()
+        if sup is not None:
+            out[decl.name().upper()] = (decl.name(), decl.index_in_schema())
+    return out
+
+def _step_wrapped_value(nominal):
+    """Mimic ifcopenshell's NominalValue.wrappedValue for a parsed typed value."""
+    if not isinstance(nominal, tuple) or nominal[0] in ("#", ".") or not nominal[1]:
+        raise ValueError("no wrapped value")
+    val = nominal[1][0]
+    if isinstance(val, tuple) and val[0] == ".":
+        return {"T": True, "F": False}.get(val[1], "UNKNOWN")
+    if isinstance(val, list):
+        return tuple(val)
+    return val
+
+def extract_id_daten_streaming(filepath):
+    """
+    Same rows as extract_id_daten_filtered, read straight from the IFC-SPF text
+    in two line-by-line passes instead of loading the model:
+
+      1. products whose Name matches TARGETS, and the ID-Daten psets
+      2. IfcRelDefinesByProperties pointing at those psets, and their properties
+
+    Only those entities are kept, so memory grows with the matched elements,
+    not with the file.
+    """
+    product_types = _product_types(_step_schema_name(filepath))
+    match_target = get_target_matcher()
+
+    products = {}     # id -> (IfcType, schema index, GlobalId, Name, target index)
+    psets = {}        # ID-Daten pset id -> [property ids]
+    with open(filepath, "r", encoding="latin-1") as fp:
+        for sid, etype, text, pos in _iter_step_records(fp):
+            if etype in product_types:
+                args = _parse_step_args(text, pos)
+                name = args[2] if len(args) > 2 and isinstance(args[2], str) else ""
+                idx = match_target(name)
+                if idx is not None:
+                    type_name, order = product_types[etype]
+                    products[sid] = (type_name, order, args[0], name, idx)
+            elif etype == "IFCPROPERTYSET":
+                args = _parse_step_args(text, pos)
+                pset_name = args[2] if isinstance(args[2], str) else ""
+                if pset_name.strip().lower() == "id-daten":
+                    psets[sid] = [a[1] for a in (args[4] or []) if isinstance(a, tuple) and a[0] == "#"]
+
+    wanted_props = {pid for pids in psets.values() for pid in pids}
+    element_psets = {}  # product id -> [ID-Daten pset ids]
+    props = {}          # property id -> (name, value)
+    with open(filepath, "r", encoding="latin-1") as fp:
+        for sid, etype, text, pos in _iter_step_records(fp):
+            if etype == "IFCRELDEFINESBYPROPERTIES":
+                args = _parse_step_args(text, pos)
+                pdef = args[5] if len(args) > 5 else None
+                if not (isinstance(pdef, tuple) and pdef[0] == "#" and pdef[1] in psets):
+                    continue
+                for obj in args[4] or []:
+                    if isinstance(obj, tuple) and obj[1] in products:
+                        element_psets.setdefault(obj[1], []).append(pdef[1])
+            elif sid in wanted_props:
+                args = _parse_step_args(text, pos)
+                val = None
+                if etype == "IFCPROPERTYSINGLEVALUE":
+                    try:
+                        val = _step_wrapped_value(args[2])
+                    except Exception:
+                        val = None
+                if isinstance(val, (int, float)):
+                    val = round(float(val), 2)
+                props[sid] = (args[0], val)
+
+    results = []
+    # ifcopenshell's by_type("IfcProduct") yields per entity type (schema order), then by id
+    for sid in sorted(products, key=lambda k: (products[k][1], k)):
+        type_name, _, gid, name, idx = products[sid]
+        tgt = TARGETS[idx]
+        id_daten_raw = {}
+        for pset_id in sorted(element_psets.get(sid, [])):  # same override order as the index
+            for pid in psets[pset_id]:
+                if pid in props:
+                    pname, val = props[pid]
+                    id_daten_raw[pname] = val
+
+        filtered = {}
+        for col_label, candidates in tgt["keys"].items():
+            val = None
+            for c in candidates:
+                if c in id_daten_raw and id_daten_raw[c] is not None:
+                    val = id_daten_raw[c]
+                    break
+            filtered[col_label] = val
+
+        if not any(v is not None for v in filtered.values()):
+            continue
+
+        results.append({
+            "Short": tgt["short"],
+            "IfcType": type_name,
+            "GlobalId": gid,
+            "Name": name,
+            "Values": filtered,
+        })
+
+    return results
+
+def extract_rows(filepath):
+    """Pick the extractor: streaming for files above IFC_STREAMING_MIN_MB, else ifcopenshell."""
+    if IFC_STREAMING_MIN_MB > 0 and os.path.getsize(filepath) >= IFC_STREAMING_MIN_MB * 1024 * 1024:
+        with metrics.span("extract_streaming"):
+            return extract_id_daten_streaming(filepath)
+    return extract_id_daten_filtered(filepath)
+
+def extract_rows_cached(filepath, digest, cache_folder=EXTRACT_CACHE_FOLDER):
+    """
+    extract_rows, memoized on disk (in cache_folder) by the upload's sha256. The
+    key also carries the TARGETS fingerprint and EXTRACT_VERSION, so changing the
+    detection config invalidates old entries without any cleanup step.
+    """
+    key = f"{digest}-{targets_fingerprint()[:16]}-v{EXTRACT_VERSION}"
+    cached = _cache_get_json(cache_folder, key)
+    metrics.cache("extract", cached is not None)
+    if cached is not None:
+        return cached
+    rows = extract_rows(filepath)
+    _cache_put_json(cache_folder, key, rows, int(EXTRACT_CACHE_MAX_MB * 1024 * 1024))
+    return rows
+
+# -----------------------------
+# Check pipeline
+# -----------------------------
+# Attributes evaluated per object type (Short, lowercased)
+CHECKED_ATTRS = {
+    "rampe": ("Breite (m)", "Länge (m)", "Neigung (%)"),
+    "bahnsteig": ("Bahnsteighöhe (m)",),
+    "schiene": ("Längsneigung (%)",),
+    "schwelle": ("Spurbreite (m)",),
+    "mast": ("Abstand Gleismitte (m)",),
+}
+
+def _compile_rule(attr_label, standards, ops_map, ranges_map):
+    """
+    Resolve saved operator + stored values/ranges for one attribute into a rule:
+    ("range", min, max) | (">=", target) | ("<=", target) | ("≈", target, tol) | None.
+    None means insufficient data; checks for that attribute are None.
+    """
+    op = (ops_map.get(attr_label) or "").strip()
+    # Bahnsteighöhe uses dedicated min/max keys
+    if attr_label == "Bahnsteighöhe (m)":
+        if op == "range":
+            mn = standards.get("Bahnsteighöhe min (m)")
+            mx = standards.get("Bahnsteighöhe max (m)")
+            if mn is None and mx is None: return None
+            return ("range", mn, mx)
+        # fallback to flat compare if someone set >=/<= or ≈ on Bahnsteighöhe
+        target = standards.get("Bahnsteighöhe min (m)")  # use min as anchor
+        if target is None: return None
+        if op in (">=", "<="): return (op, target)
+        if op == "≈":  return ("≈", target, 0.01)
+        # default: no rule
+        return None
+
+    # Non-Bahnsteig attributes
+    if op == "range":
+        rng = ranges_map.get(attr_label) or {}
+        mn, mx = rng.get("min"), rng.get("max")
+        if mn is None and mx is None: return None
+        return ("range", mn, mx)
+
+    target = standards.get(attr_label)
+    if target is None:
+        # Bahnsteighöhe legacy handled above via min/max
+        return None
+
+    if op == "≈":
+        # small default tol; tweak per-unit if you want
+        return ("≈", target, 0.001 if attr_label.endswith("(m)") else 0.1)
+
+    if op in (">=", "<="):
+        return (op, target)
+
+    # No operator saved -> keep legacy defaults (>= for Breite/Länge/Abstand, <= for Neigung/Längsneigung, ≈ for Spurbreite)
+    if attr_label in ("Breite (m)", "Länge (m)", "Abstand Gleismitte (m)"):
+        return (">=", target)
+    if attr_label in ("Neigung (%)", "Längsneigung (%)"):
+        return ("<=", target)
+    if attr_label == "Spurbreite (m)":
+        return ("≈", target, 0.001)
+    return None
+
+def compile_rules(standards):
+    """Rule table {attribute: rule} for every checked attribute."""
+    ops_map = standards.get('_ops', {}) or {}
+    ranges_map = standards.get('_ranges', {}) or {}
+    attrs = {a for labels in CHECKED_ATTRS.values() for a in labels}
+    return {a: _compile_rule(a, standards, ops_map, ranges_map) for a in attrs}
+
+def _eval_rule(rule, value):
+    """Scalar evaluation of one compiled rule (True/False, None without a rule)."""
+    if rule is None or value is None:
+        return None
+    kind = rule[0]
+    if kind == "range":
+        ok = True
+        if rule[1] is not None: ok = ok and (value >= rule[1])
+        if rule[2] is not None: ok = ok and (value <= rule[2])
+        return ok
+    if kind == ">=":
+        return value >= rule[1]
+    if kind == "<=":
+        return value <= rule[1]
+    return abs(value - rule[1]) <= rule[2]
+
+def _eval_rule_column(rule, values):
+    """Evaluate one rule over all values of an attribute with NumPy array ops."""
+    if rule is None:
+        return [None] * len(values)
+    if not set(map(type, values)) <= {float, int}:
+        # labels or other non-numeric values: keep the scalar semantics (incl. its errors)
+        return [_eval_rule(rule, v) for v in values]
+    arr = np.asarray(values, dtype=np.float64)
+    kind = rule[0]
+    if kind == "range":
+        ok = np.ones(arr.shape, dtype=bool)
+        if rule[1] is not None: ok &= arr >= rule[1]
+        if rule[2] is not None: ok &= arr <= rule[2]
+    elif kind == ">=":
+        ok = arr >= rule[1]
+    elif kind == "<=":
+        ok = arr <= rule[1]
+    else:
+        ok = np.abs(arr - rule[1]) <= rule[2]
+    return ok.tolist()
+
+def check_rows(rows, standards, rules=None):
+    """
+    Evaluate every row against the saved standards; sets r["checks"] in place.
+    Values are gathered per attribute and each attribute's rule is applied to
+    the whole column at once.
+    """
+    if rules is None:
+        rules = compile_rules(standards)
+
+    columns = {attr: ([], []) for attr in rules}  # attr -> ([checks dicts], [values])
+    attrs_for_short = {}
+    for r in rows:
+        short = r["Short"]
+        wanted = attrs_for_short.get(short)
+        if wanted is None:
+            wanted = attrs_for_short[short] = CHECKED_ATTRS.get((short or "").lower(), ())
+        checks = {}
+        vals = r["Values"]
+        for attr in wanted:
+            v = vals.get(attr)
+            if v is not None:
+                checks[attr] = None  # placeholder keeps the attribute order
+                col = columns[attr]
+                col[0].append(checks)
+                col[1].append(v)
+        r["checks"] = checks
+
+    for attr, (targets, values) in columns.items():
+        if not values:
+            continue
+        for checks, ok in zip(targets, _eval_rule_column(rules.get(attr), values)):
+            checks[attr] = ok
+    return rows
+
+def _pack_rows(rows):
+    """
+    Compact wire format for checked rows: zlib'd JSON of tuples, with the
+    strings that repeat on every element (Short, IfcType, Name, attribute
+    labels) stored once in a string table.
+    """
+    strings, ids = [], {}
+
+    def ref(text):
+        i = ids.get(text)
+        if i is None:
+            i = ids[text] = len(strings)
+            strings.append(text)
+        return i
+
+    packed = []
+    for r in rows:
+        packed.append([
+            ref(r["Short"]), ref(r["IfcType"]), r["GlobalId"], ref(r["Name"]),
+            [[ref(k), v] for k, v in r["Values"].items()],
+            [[ref(k), c] for k, c in (r.get("checks") or {}).items()],
+        ])
+    raw = json.dumps([strings, packed], ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(raw.encode("utf-8"), 6)
+
+def _unpack_rows(blob):
+    strings, packed = json.loads(zlib.decompress(blob).decode("utf-8"))
+    return [{
+        "Short": strings[short],
+        "IfcType": strings[ifctype],
+        "GlobalId": gid,
+        "Name": strings[name],
+        "Values": {strings[k]: v for k, v in values},
+        "checks": {strings[k]: c for k, c in checks},
+    } for short, ifctype, gid, name, values, checks in packed]
+
+def _parse_and_check(filepath, digest, standards, rules=None, cache_folder=EXTRACT_CACHE_FOLDER):
+    """
+    CPU-bound part of a check (open, extract, evaluate); runs in the process pool.
+    Returns the packed rows and the metrics recorded meanwhile (see metrics.drain).
+    """
+    rows = extract_rows_cached(filepath, digest, cache_folder)
+    with metrics.span("check"):
+        check_rows(rows, standards, rules)
+    return _pack_rows(rows), metrics.drain()
+
+def _parse_only(filepath, digest, cache_folder=EXTRACT_CACHE_FOLDER):
+    """Extraction part of _parse_and_check (rows without checks); runs in the process pool."""
+    return _pack_rows(extract_rows_cached(filepath, digest, cache_folder)), metrics.drain()
+
+# -----------------------------
+# Result tables (summary, report and export lines)
+# -----------------------------
+def compute_table_columns(rows):
+    cols = set()
+    for r in rows:
+        cols.update(r["Values"].keys())
+    order_hint = ["Breite (m)", "Länge (m)", "Neigung (%)",
+                  "Spurbreite (m)", "Längsneigung (%)", "Bahnsteighöhe (m)", "Abstand Gleismitte (m)"]
+    return [c for c in order_hint if c in cols] + [c for c in sorted(cols) if c not in order_hint]
+
+def _short_gid(gid: str) -> str:
+    return gid[:8] + "…" if gid and len(gid) > 9 else (gid or "")
+
+def _status_mark(ok):
+    if ok is True:  return "✓"
+    if ok is False: return "✗"
+    return "–"
+
+def _row_status(r):
+    """ok / fail / missing for one checked row (same rules as _collect_summary)."""
+    checks = r.get("checks") or {}
+    vals   = r.get("Values") or {}
+    considered = [checks.get(k) for k, v in vals.items() if v is not None]
+    if not considered:
+        return "missing"
+    if all(v is True for v in considered):
+        return "ok"
+    if any(v is False for v in considered):
+        return "fail"
+    return "missing"
+
+def _collect_summary(rows):
+    total = len(rows)
+    ok_elems = fail_elems = missing_elems = 0
+    for r in rows:
+        status = _row_status(r)
+        if status == "ok":
+            ok_elems += 1
+        elif status == "fail":
+            fail_elems += 1
+        else:
+            missing_elems += 1
+    return total, ok_elems, fail_elems, missing_elems
+
+DETAIL_TABLE_HEADER = ["Objekt", "IFC-Typ", "GlobalId", "Attribut", "Wert", "Grenzwert", "Operator", "Ergebnis"]
+
+def _iter_detailed_table_rows(rows, standards, ops_map, ranges_map, only_failures=False, short_gid=True):
+    """One table line per non-empty checked value; with only_failures just the failed checks."""
+    for r in rows:
+        short   = r.get("Short") or ""
+        ifctype = r.get("IfcType") or ""
+        gid     = r.get("GlobalId") or ""
+        if short_gid:
+            gid = _short_gid(gid)
+        vals    = r.get("Values") or {}
+        checks  = r.get("checks") or {}
+        for attr, val in vals.items():
+            if val is None:
+                continue
+            if only_failures and checks.get(attr) is not False:
+                continue
+            op = (ops_map.get(attr) or "").strip()
+            std_txt = "-"
+            if attr == "Bahnsteighöhe (m)" and op == "range":
+                mn = standards.get("Bahnsteighöhe min (m)")
+                mx = standards.get("Bahnsteighöhe max (m)")
+                if mn is not None or mx is not None:
+                    std_txt = f"{mn if mn is not None else '–'}–{mx if mx is not None else '–'}"
+            elif op == "range":
+                rng = ranges_map.get(attr) or {}
+                mn, mx = rng.get("min"), rng.get("max")
+                if mn is not None or mx is not None:
+                    std_txt = f"{mn if mn is not None else '–'}–{mx if mx is not None else '–'}"
+            else:
+                v = standards.get(attr)
+                if v is not None:
+                    std_txt = f"{v}"
+            mark = _status_mark(checks.get(attr))
+            yield [short, ifctype, gid, attr, val, std_txt, (op or "—"), mark]
+
+def _flatten_rows_for_detailed_table(rows, standards, ops_map, ranges_map):
+    return list(_iter_detailed_table_rows(rows, standards, ops_map, ranges_map))
+
+_CHECK_WORDS = {True: "ok", False: "fail", None: ""}
+
+def element_table(rows, columns, with_file=False):
+    """(header, line iterator): one line per element with value and check result per column."""
+    header = (["Datei"] if with_file else []) + ["Objekt", "IFC-Typ", "GlobalId", "Name", "Status"]
+    for c in columns:
+        header += [c, f"{c} Prüfung"]
+    def _lines():
+        for r in rows:
+            vals, checks = r.get("Values") or {}, r.get("checks") or {}
+            line = [r.get("File")] if with_file else []
+            line += [r.get("Short"), r.get("IfcType"), r.get("GlobalId"), r.get("Name"), _row_status(r)]
+            for c in columns:
+                line += [vals.get(c), _CHECK_WORDS.get(checks.get(c), "")]
+            yield line
+    return header, _lines()
+
+# -----------------------------
+# Revision diff (match rows of two uploads by GlobalId)
+# -----------------------------
+_DIFF_FIELDS = ("Short", "IfcType", "Name", "Values")
+
+def diff_rows(baseline, rows):
+    """
+    Compare extracted rows of a revision with the rows of a baseline result.
+    Rows are matched by GlobalId; a row is unchanged when Short, IfcType, Name
+    and all Values are equal. Rows without a GlobalId (or repeating one) can't
+    be matched and count as added.
+    Returns {"unchanged": [(row, baseline row)], "changed": [(row, baseline row)],
+    "added": [row], "removed": [baseline row]}.
+    """
+    by_gid = {}
+    for b in baseline:
+        gid = b.get("GlobalId")
+        if gid and gid not in by_gid:
+            by_gid[gid] = b
+    out = {"unchanged": [], "changed": [], "added": [], "removed": []}
+    for r in rows:
+        b = by_gid.pop(r.get("GlobalId") or None, None)
+        if b is None:
+            out["added"].append(r)
+        elif all(r.get(k) == b.get(k) for k in _DIFF_FIELDS):
+            out["unchanged"].append((r, b))
+        else:
+            out["changed"].append((r, b))
+    out["removed"] = list(by_gid.values())
+    return out
+
+def _diff_entry(change, r, attrs=(), before=None, after=None):
+    return {"change": change, "GlobalId": r.get("GlobalId"), "Short": r.get("Short"),
+            "IfcType": r.get("IfcType"), "Name": r.get("Name"),
+            "attrs": list(attrs), "before": before, "after": after}
+
+def summarize_diff(diff):
+    """JSON-able summary of diff_rows: counts plus one entry per added, changed or removed element."""
+    elements = [_diff_entry("added", r, after=_row_status(r)) for r in diff["added"]]
+    for r, b in diff["changed"]:
+        new, old = r.get("Values") or {}, b.get("Values") or {}
+        attrs = [k for k in dict.fromkeys([*old, *new]) if new.get(k) != old.get(k)]
+        elements.append(_diff_entry("changed", r, attrs, _row_status(b), _row_status(r)))
+    elements += [_diff_entry("removed", b, before=_row_status(b)) for b in diff["removed"]]
+    return {
+        "added": len(diff["added"]),
+        "changed": len(diff["changed"]),
+        "removed": len(diff["removed"]),
+        "unchanged": len(diff["unchanged"]),
+        "elements": elements,
+    }
@@ -0,0 +1,149 @@
+"""
+Headless IFC checker: runs the check pipeline of the web app over IFC files or
+whole directory trees, without Flask or the OpenAI client.
+
+    python cli.py models/ --standards uploads/ifc/standards.json --out results/ --jobs 8
+    python cli.py a.ifc b.ifc --format csv --report failures
+
+For every file it writes <name>.json and/or <name>.csv (and <name>.pdf with
+--report) under --out, mirroring the input tree, plus summary.json for the run.
+Exit code 0 on success, 1 if a file could not be read, 2 with
+--fail-on-violations when a check failed.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import checker
+import report
+
+DEFAULT_STANDARDS = os.path.join("uploads", "ifc", "standards.json")
+
+def find_ifc_files(paths):
+    """(path, output stem) for every .ifc in paths; directories are searched recursively."""
+    for root in paths:
+        if os.path.isfile(root):
+            yield root, os.path.splitext(os.path.basename(root))[0]
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(".ifc"):
+                    path = os.path.join(dirpath, name)
+                    yield path, os.path.splitext(os.path.relpath(path, root))[0]
+
+def _sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _write_csv(path, rows, columns):
+    header, lines = checker.element_table(rows, columns)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for line in lines:
+            writer.writerow(["" if v is None else v for v in line])
+
+def check_file(path, stem, standards, rules, out_dir, formats, report_mode=None, cache_dir=None):
+    """Extract, check and write one file; returns its summary (rows stay in the worker)."""
+    started = time.perf_counter()
+    entry = {"file": path, "error": None}
+    try:
+        digest = _sha256(path)
+        if cache_dir:
+            rows = checker.extract_rows_cached(path, digest, cache_dir)
+        else:
+            rows = checker.extract_rows(path)
+        checker.check_rows(rows, standards, rules)
+    except Exception as e:
+        entry["error"] = str(e)
+        entry["seconds"] = round(time.perf_counter() - started, 3)
+        return entry
+
+    entry["sha256"] = digest
+    entry["total"], entry["ok"], entry["fail"], entry["missing"] = checker._collect_summary(rows)
+    columns = checker.compute_table_columns(rows)
+    base = os.path.join(out_dir, stem)
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    if "json" in formats:
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({"file": path, "sha256": digest, "columns": columns, "rows": rows,
+                       "summary": {k: entry[k] for k in ("total", "ok", "fail", "missing")}},
+                      f, ensure_ascii=False)
+    if "csv" in formats:
+        _write_csv(base + ".csv", rows, columns)
+    if report_mode:
+        payload = {"rows": rows, "standards": standards,
+                   "_ops": standards.get("_ops", {}) or {}, "_ranges": standards.get("_ranges", {}) or {}}
+        with open(base + ".pdf", "wb") as f:
+            f.write(report._generate_results_pdf_report(payload, mode=report_mode).getvalue())
+    entry["seconds"] = round(time.perf_counter() - started, 3)
+    return entry
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("paths", nargs="+", help=".ifc files and/or directories")
+    ap.add_argument("--standards", default=DEFAULT_STANDARDS,
+                    help=f"standards.json of the web app (default: {DEFAULT_STANDARDS})")
+    ap.add_argument("--out", default="results", help="output directory (default: results)")
+    ap.add_argument("--format", default="json,csv", help="comma separated: json, csv (default: json,csv)")
+    ap.add_argument("--report", choices=report.REPORT_MODES, help="also write a PDF report per file")
+    ap.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    ap.add_argument("--cache-dir", help="reuse extracted rows of unchanged files from this folder")
+    ap.add_argument("--fail-on-violations", action="store_true", help="exit with 2 if any check failed")
+    args = ap.parse_args(argv)
+
+    formats = {f.strip() for f in args.format.split(",") if f.strip()}
+    if not formats <= {"json", "csv"}:
+        ap.error("--format takes json and/or csv")
+    if not os.path.isfile(args.standards):
+        print(f"warning: {args.standards} not found, checking without limits", file=sys.stderr)
+    standards = checker.read_standards(args.standards)
+    rules = checker.compile_rules(standards)
+    files = list(find_ifc_files(args.paths))
+    if not files:
+        ap.error("no .ifc files found")
+    os.makedirs(args.out, exist_ok=True)
+
+    task = (standards, rules, args.out, formats, args.report, args.cache_dir)
+    results = []
+    started = time.perf_counter()
+    if args.jobs <= 1:
+        done = (check_file(path, stem, *task) for path, stem in files)
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(args.jobs, len(files)))
+        futures = [pool.submit(check_file, path, stem, *task) for path, stem in files]
+        done = (fut.result() for fut in as_completed(futures))
+    try:
+        for entry in done:
+            results.append(entry)
+            if entry["error"]:
+                print(f"FEHLER  {entry['file']}: {entry['error']}")
+            else:
+                print(f"{entry['file']}: {entry['total']} Elemente, {entry['ok']} konform, "
+                      f"{entry['fail']} nicht konform, {entry['missing']} nicht bewertet ({entry['seconds']} s)")
+    finally:
+        if args.jobs > 1:
+            pool.shutdown()
+
+    results.sort(key=lambda e: e["file"])
+    with open(os.path.join(args.out, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump({"standards": args.standards, "seconds": round(time.perf_counter() - started, 3),
+                   "files": results}, f, ensure_ascii=False, indent=2)
+
+    if any(e["error"] for e in results):
+        return 1
+    if args.fail_on_violations and any(e["fail"] for e in results):
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+# Read by gunicorn from the working directory (see Dockerfile CMD).
+
+def post_fork(server, worker):
+    """Start the background check workers in every worker process right away."""
+    import main
+    main.start_job_workers()
@@ -1,37 +1,58 @@
-from flask import Flask, render_template, request, redirect, flash, url_for, session, send_file, abort, send_from_directory
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame
-from reportlab.pdfgen.canvas import Canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase.pdfmetrics import stringWidth
-import os, json, hashlib
+from flask import Flask, render_template, request, redirect, flash, url_for, session, send_file, abort, send_from_directory, jsonify, Response, g
+from io import BytesIO, StringIO
+import os, json, hashlib, tempfile
+import sqlite3, threading, socket, uuid, time, atexit, multiprocessing, copy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: in-process locking only
+    fcntl = None
 from dotenv import load_dotenv
 from openai import OpenAI
 from werkzeug.utils import secure_filename
-import ifcopenshell
-from pdfminer.high_level import extract_text as pdf_extract_text
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from pdfminer.utils import open_filename
 import requests
 from bs4 import BeautifulSoup
-import re, html as html_unescape
+import re, math, html as html_unescape
+import csv, zipfile, zlib
+from xml.sax.saxutils import escape as xml_escape
 
 load_dotenv()
 
+# The check pipeline and the PDF report live in checker.py / report.py (also used by cli.py);
+# imported after load_dotenv() because their settings come from the environment.
+from checker import (
+    TARGETS, EXTRACT_CACHE_FOLDER, _cache_get_json, _cache_put_json, _cache_evict_lru,
+    _read_standards_file, compile_rules, check_rows, _parse_and_check, _parse_only, _unpack_rows,
+    compute_table_columns, _row_status, _collect_summary, _iter_detailed_table_rows,
+    DETAIL_TABLE_HEADER, element_table, diff_rows, summarize_diff,
+)
+from report import REPORT_MODES, _generate_results_pdf_report
+import metrics
+
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 UPLOAD_IFC_FOLDER = 'uploads/ifc'
+IFC_OBJECTS_FOLDER = os.path.join(UPLOAD_IFC_FOLDER, 'objects')  # uploads stored by sha256
 UPLOAD_SRC_FOLDER = 'uploads/sources'   # local PDF sources
 URL_CACHE_FOLDER  = 'url_cache'         # cache for URL fetches (HTML/PDF -> text)
+PDF_TEXT_CACHE_FOLDER = 'pdf_text_cache'  # cache for local source PDFs (PDF -> text)
+RETRIEVAL_INDEX_FOLDER = 'retrieval_index'  # BM25 chunk indexes of source texts
+JOBS_DB = 'jobs.db'                     # persistent queue of /upload check jobs
+AI_CACHE_FOLDER = 'ai_cache'            # parsed AI extractions of standard sources
+RESULTS_DB = 'results.db'               # checked rows per upload, referenced from the session
+REPORT_CACHE_FOLDER = 'report_cache'    # rendered PDF reports, keyed by their content
+METRICS_DB = 'metrics.db'               # latency histograms / cache counters of all workers
 ALLOWED_IFC_EXTENSIONS = {'ifc'}
+ALLOWED_BATCH_EXTENSIONS = {'ifc', 'zip'}
 ALLOWED_SRC_EXTENSIONS = {'pdf'}
 STANDARDS_FILE = os.path.join(UPLOAD_IFC_FOLDER, 'standards.json')
-STATIC_IMG_DIR = os.path.join(os.path.dirname(__file__), "static", "img")
-DB_LOGO_PATH   = os.path.join(STATIC_IMG_DIR, "db-infrago.png")
-UDE_LOGO_PATH  = os.path.join(STATIC_IMG_DIR, "ude-logo.png")
 
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
@@ -41,40 +62,49 @@ app.secret_key = 'supersecretkey'
 app.config['UPLOAD_IFC_FOLDER'] = UPLOAD_IFC_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 300 * 1024 * 1024
 
-# -----------------------------
-# Detection config
-# -----------------------------
-TARGETS = [
-    {
-        "match": ["Schwelle"],
-        "short": "Schwelle",
-        "keys": {"Spurbreite (m)": ["Spurbreite", "Spurbereite"]},
-    },
-    {
-        "match": ["Schiene 12210", "Schiene"],
-        "short": "Schiene",
-        "keys": {"Längsneigung (%)": ["Längsneigung", "Laengsneigung", "Neigung längs", "Neigung laengs"]},
-    },
-    {
-        "match": ["ice DB_BSK_76_Pass:ProVI DB_BSK_76_Pass 0.7368:1030184", "Bahnsteig"],
-        "short": "Bahnsteig",
-        "keys": {"Bahnsteighöhe (m)": ["Bahnsteigshöhe", "Bahnsteig_hoehe", "Bahnsteig Höhe", "Bahnsteighöhe"]},
-    },
-    {
-        "match": ["ice DB_Beleuchtungsmast_1_einseitig", "Beleuchtungsmast", "Mast"],
-        "short": "Mast",
-        "keys": {"Abstand Gleismitte (m)": ["Abstand_Gleismitte", "Abstand Gleismitte", "Gleismitte Abstand"]},
-    },
-    {
-        "match": ["Rampe:Rampe max.100%:1274060:1", "Rampe"],
-        "short": "Rampe",
-        "keys": {
-            "Breite (m)": ["Breite"],
-            "Länge (m)": ["Länge", "Laenge"],
-            "Neigung (%)": ["Neigung"],
-        },
-    },
-]
+# Background check workers per gunicorn process, and how long finished jobs are kept.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2") or 2)
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24") or 24)
+JOB_WORKER_BACKOFF_SECONDS = 5  # pause of a job worker after a queue (database) error
+# Stored results not viewed/downloaded for this long are deleted.
+RESULT_TTL_HOURS = float(os.getenv("RESULT_TTL_HOURS", "72") or 72)
+# After a standards change, results used within this many hours are re-checked in the background.
+RECHECK_RECENT_HOURS = float(os.getenv("RECHECK_RECENT_HOURS", "24") or 0)
+# Rows per page of /api/results/<id>/rows (default and upper bound of ?per_page).
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "100") or 100)
+RESULTS_PAGE_MAX = 1000
+# How often a worker adds its recorded metrics to METRICS_DB; with a token set, /metrics
+# requires "Authorization: Bearer <token>".
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5") or 0)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Processes for IFC parsing/extraction/checks (outside the GIL); 0 runs them in the job thread.
+IFC_PROCESS_WORKERS = int(os.getenv("IFC_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Disk quota of stored IFC uploads; least recently used files not needed by a queued or
+# running job are deleted beyond it. Files used within the grace period are always kept.
+IFC_STORE_MAX_MB = float(os.getenv("IFC_STORE_MAX_MB", "4096") or 0)
+IFC_STORE_GRACE_MINUTES = float(os.getenv("IFC_STORE_GRACE_MINUTES", "30") or 0)
+# Batch uploads: max. IFC files per batch and max. unpacked size of uploaded zip archives.
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "100") or 100)
+BATCH_MAX_UNZIPPED_MB = float(os.getenv("BATCH_MAX_UNZIPPED_MB", "4096") or 4096)
+# Size cap of the rendered report cache; bump the version whenever the report layout changes.
+REPORT_CACHE_MAX_MB = float(os.getenv("REPORT_CACHE_MAX_MB", "256") or 0)
+REPORT_TEMPLATE_VERSION = 1
+# Standard-source extraction: parallel attributes, per OpenAI call timeout, budget for all (seconds).
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "4") or 4)
+AI_CALL_TIMEOUT = float(os.getenv("AI_CALL_TIMEOUT", "45") or 45)
+AI_TOTAL_TIMEOUT = float(os.getenv("AI_TOTAL_TIMEOUT", "90") or 90)
+AI_MODEL = "gpt-4o-mini"
+# Bump whenever the extraction prompt changes; part of the AI cache key.
+AI_PROMPT_VERSION = 1
+AI_CACHE_TTL_HOURS = float(os.getenv("AI_CACHE_TTL_HOURS", str(30 * 24)) or 0)
+# Unparsable answers are only remembered this long (0: not at all), so one bad completion doesn't stick
+AI_CACHE_NEGATIVE_TTL_HOURS = float(os.getenv("AI_CACHE_NEGATIVE_TTL_HOURS", "1") or 0)
+AI_CACHE_MAX_MB = float(os.getenv("AI_CACHE_MAX_MB", "64") or 0)
+# "retrieval": prompt gets only the top-k BM25 chunks of a source; "full": first 160k chars.
+AI_CONTEXT_MODE = os.getenv("AI_CONTEXT_MODE", "retrieval")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8") or 8)
+RETRIEVAL_CHUNK_CHARS = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "1200") or 1200)
+RETRIEVAL_INDEX_MAX_MB = float(os.getenv("RETRIEVAL_INDEX_MAX_MB", "128") or 0)
 
 # -----------------------------
 # Helpers
@@ -85,32 +115,6 @@ def allowed_file(filename, allowed_exts):
 def _allowed_src_file(filename):
     return allowed_file(filename, ALLOWED_SRC_EXTENSIONS)
 
-def _load_logo(path):
-    try:
-        if os.path.isfile(path):
-            return ImageReader(path)
-    except Exception:
-        pass
-    return None
-
-DB_LOGO_IMG  = _load_logo(DB_LOGO_PATH)
-UDE_LOGO_IMG = _load_logo(UDE_LOGO_PATH)
-
-def _wrap_to_width(text, max_width_pt, font="Helvetica", size=7):
-    """Greedy wrap into lines that fit max_width_pt with the given font/size."""
-    words = (text or "").split()
-    lines, cur = [], ""
-    for w in words:
-        cand = (cur + " " + w).strip()
-        if cur and stringWidth(cand, font, size) > max_width_pt:
-            lines.append(cur)
-            cur = w
-        else:
-            cur = cand
-    if cur:
-        lines.append(cur)
-    return lines
-
 def _store_source_pdf(fs):
     """Save uploaded PDF to UPLOAD_SRC_FOLDER and return the saved filename."""
     if not fs or fs.filename == '':
@@ -129,37 +133,183 @@ def _store_source_pdf(fs):
     fs.save(path)
     return candidate
 
-def load_standards():
-    defaults = {
-        "Breite (m)": None,
-        "Länge (m)": None,
-        "Neigung (%)": None,
-        "Spurbreite (m)": None,
-        "Längsneigung (%)": None,
-        "Bahnsteighöhe min (m)": None,
-        "Bahnsteighöhe max (m)": None,
-        "Abstand Gleismitte (m)": None,
-        "_sources": {},  # attribute -> {"link": str|None, "file": filename|None}
-        "_ops": {},
-        "_ranges": {}
-    }
-    if os.path.exists(STANDARDS_FILE):
+# -----------------------------
+# IFC upload store (content-addressed, deduplicated, LRU within a quota)
+# -----------------------------
+def _ifc_object_path(digest):
+    return os.path.join(IFC_OBJECTS_FOLDER, digest[:2], f"{digest}.ifc")
+
+def store_ifc_upload(fs, chunk_size=1024 * 1024):
+    """
+    Stream an upload (FileStorage or binary file object) to a private temp file
+    while hashing it, then move it to IFC_OBJECTS_FOLDER/<sha[:2]>/<sha>.ifc.
+    Returns (path, sha256). Concurrent uploads never share a file, and
+    identical uploads are stored once.
+    """
+    stream = getattr(fs, "stream", fs)
+    os.makedirs(IFC_OBJECTS_FOLDER, exist_ok=True)
+    h = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=IFC_OBJECTS_FOLDER, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                h.update(chunk)
+                out.write(chunk)
+        digest = h.hexdigest()
+        path = _ifc_object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(tmp)
+            os.utime(path)  # dedup hit counts as use
+        else:
+            os.replace(tmp, path)
+    except BaseException:
         try:
-            with open(STANDARDS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if "_sources" not in data:
-                    data["_sources"] = {}
-                if "_ops" not in data:
-                    data["_ops"] = {}
-                defaults.update(data or {})
-        except Exception:
+            os.remove(tmp)
+        except OSError:
             pass
-    return defaults
+        raise
+    return path, digest
+
+def evict_ifc_store(max_bytes=None):
+    """Trim IFC_OBJECTS_FOLDER to the quota, oldest use first; returns the number of files removed."""
+    max_bytes = int(IFC_STORE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+    if not max_bytes or not os.path.isdir(IFC_OBJECTS_FOLDER):
+        return 0
+    now = time.time()
+    entries, total = [], 0
+    for root, _, files in os.walk(IFC_OBJECTS_FOLDER):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".tmp"):
+                if st.st_mtime < now - 24 * 3600:  # left over from an aborted upload
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= max_bytes:
+        return 0
+    in_use = set()
+    with closing(_jobs_db()) as db:
+        for r in db.execute("SELECT filepath, files FROM jobs WHERE status IN ('queued', 'running')"):
+            in_use.add(os.path.abspath(r["filepath"]))
+            in_use.update(os.path.abspath(f["filepath"]) for f in json.loads(r["files"] or "[]"))
+    removed = 0
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if mtime >= now - IFC_STORE_GRACE_MINUTES * 60 or os.path.abspath(path) in in_use:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+def _evict_ifc_store_after_upload():
+    """evict_ifc_store for the upload routes; the job is queued already, so a failed trim is only logged."""
+    try:
+        evict_ifc_store()
+    except (OSError, sqlite3.Error, ValueError):
+        app.logger.exception("Trimming the IFC store failed")
+
+# Process-wide copy of standards.json, reloaded only when the file changes.
+_standards_cache = {"stamp": None, "data": None, "version": None}
+_standards_cache_lock = threading.Lock()
+
+def _standards_stamp():
+    try:
+        st = os.stat(STANDARDS_FILE)
+    except OSError:
+        return None
+    # atomic saves replace the file, so the inode changes even within one mtime tick
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def standards_snapshot():
+    """(standards, version) from the in-memory cache; version is a content hash."""
+    stamp = _standards_stamp()
+    with _standards_cache_lock:
+        if _standards_cache["data"] is None or _standards_cache["stamp"] != stamp:
+            raw = None
+            if stamp is not None:
+                try:
+                    with open(STANDARDS_FILE, "rb") as f:
+                        raw = f.read()
+                except OSError:
+                    raw = None
+            _standards_cache["data"] = _read_standards_file(raw)
+            _standards_cache["version"] = hashlib.sha1(raw or b"").hexdigest()[:16]
+            _standards_cache["stamp"] = stamp
+        # callers modify what they get (upload_standard), so hand out copies
+        return copy.deepcopy(_standards_cache["data"]), _standards_cache["version"]
+
+def load_standards():
+    return standards_snapshot()[0]
+
+_standards_lock_state = threading.local()
+_standards_thread_lock = threading.RLock()
+
+@contextmanager
+def standards_lock():
+    """
+    Exclusive lock for read-modify-write of standards.json, across threads
+    (RLock) and gunicorn workers (flock on a side file). Re-entrant per thread.
+    """
+    with _standards_thread_lock:
+        if getattr(_standards_lock_state, "held", False):
+            yield
+            return
+        os.makedirs(os.path.dirname(STANDARDS_FILE) or ".", exist_ok=True)
+        with open(STANDARDS_FILE + ".lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _standards_lock_state.held = True
+            try:
+                yield
+            finally:
+                _standards_lock_state.held = False
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 def save_standards(data):
-    os.makedirs(os.path.dirname(STANDARDS_FILE) or ".", exist_ok=True)
-    with open(STANDARDS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Write standards.json atomically (temp file + rename) under standards_lock."""
+    with standards_lock():
+        folder = os.path.dirname(STANDARDS_FILE) or "."
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".standards-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, STANDARDS_FILE)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+_rules_cache = {"version": None, "rules": None}
+
+def get_compiled_rules(standards, version):
+    """compile_rules for a standards snapshot, rebuilt only when its version changes."""
+    with _standards_cache_lock:
+        if _rules_cache["version"] != version:
+            _rules_cache["rules"] = compile_rules(standards)
+            _rules_cache["version"] = version
+        return _rules_cache["rules"]
 
 def _num_from(val: str):
     if val is None:
@@ -172,343 +322,105 @@ def _num_from(val: str):
     except ValueError:
         return None
 
-def extract_id_daten_filtered(filepath):
-    model = ifcopenshell.open(filepath)
-    results = []
-
-    def read_id_daten(elem):
-        out = {}
-        for rel in model.get_inverse(elem):
-            if rel.is_a("IfcRelDefinesByProperties"):
-                pdef = rel.RelatingPropertyDefinition
-                if pdef.is_a("IfcPropertySet") and (pdef.Name or "").strip().lower() == "id-daten":
-                    for prop in pdef.HasProperties or []:
-                        try:
-                            val = prop.NominalValue.wrappedValue
-                        except Exception:
-                            val = None
-                        if isinstance(val, (int, float)):
-                            val = round(float(val), 2)
-                        out[prop.Name] = val
-        return out
-
-    for e in model.by_type("IfcProduct"):
-        name = (getattr(e, "Name", "") or "")
-        low = name.lower()
-
-        for tgt in TARGETS:
-            if any(sub.lower() in low for sub in tgt["match"]):
-                id_daten_raw = read_id_daten(e)
-                filtered = {}
-                for col_label, candidates in tgt["keys"].items():
-                    val = None
-                    for c in candidates:
-                        if c in id_daten_raw and id_daten_raw[c] is not None:
-                            val = id_daten_raw[c]
-                            break
-                    filtered[col_label] = val
-
-                has_value = any(v is not None for v in filtered.values())
-                if not has_value:
-                    break
-
-                results.append({
-                    "Short": tgt["short"],
-                    "IfcType": e.is_a(),
-                    "GlobalId": e.GlobalId,
-                    "Name": name,
-                    "Values": filtered,
-                })
-                break
-
-    return results
-
-def compute_table_columns(rows):
-    cols = set()
-    for r in rows:
-        cols.update(r["Values"].keys())
-    order_hint = ["Breite (m)", "Länge (m)", "Neigung (%)",
-                  "Spurbreite (m)", "Längsneigung (%)", "Bahnsteighöhe (m)", "Abstand Gleismitte (m)"]
-    return [c for c in order_hint if c in cols] + [c for c in sorted(cols) if c not in order_hint]
-
-LEGAL_FOOTER = (
-    "DB InfraGO AG | Sitz: Frankfurt am Main | Registergericht: Frankfurt am Main HRB 50879 | "
-    "USt-IdNr.: DE 199861757 | Vorsitz des Aufsichtsrats: Berthold Huber | "
-    "Vorstand: Dr. Philipp Nagl (Vorsitz), Jens Bergmann, Dr. Christian Gruß, "
-    "Heike Junge-Latz, Klaus Müller, Heinz Siegmund, Ralf Thieme"
-)
-
-def _short_gid(gid: str) -> str:
-    return gid[:8] + "…" if gid and len(gid) > 9 else (gid or "")
-
-def _status_mark(ok):
-    if ok is True:  return "✓"
-    if ok is False: return "✗"
-    return "–"
+# -----------------------------
+# Report cache (rendered PDFs, LRU by mtime)
+# -----------------------------
+_report_renders = {}  # key -> [lock, users], so concurrent downloads of one report render it once
+_report_renders_lock = threading.Lock()
+
+def report_cache_key(payload, mode="full"):
+    """Hash of everything the rendered report depends on; also used as its ETag."""
+    h = hashlib.sha256()
+    h.update(json.dumps([REPORT_TEMPLATE_VERSION, mode, payload.get("standards") or {},
+                         payload.get("_ops") or {}, payload.get("_ranges") or {}, payload.get("files")],
+                        sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    for r in payload.get("rows") or []:
+        h.update(json.dumps([r.get("Short"), r.get("IfcType"), r.get("GlobalId"), r.get("Values"), r.get("checks")],
+                            ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def cached_report_pdf(payload, mode="full", key=None):
+    """Path of the rendered report in REPORT_CACHE_FOLDER; renders only on a miss."""
+    key = key or report_cache_key(payload, mode)
+    path = os.path.abspath(os.path.join(REPORT_CACHE_FOLDER, f"{key}.pdf"))
+    with _report_renders_lock:
+        entry = _report_renders.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            try:
+                os.utime(path)  # hit: mark as recently used
+                metrics.cache("report", True)
+                return path
+            except OSError:
+                metrics.cache("report", False)
+            with metrics.span("report_render", mode=mode):
+                buf = _generate_results_pdf_report(payload, mode=mode)
+            os.makedirs(REPORT_CACHE_FOLDER, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=REPORT_CACHE_FOLDER, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(buf.getbuffer())
+                os.replace(tmp, path)
+            except OSError:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+    finally:
+        # the last user drops the lock; popping it earlier would let a newcomer render in parallel
+        with _report_renders_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _report_renders[key]
+    if REPORT_CACHE_MAX_MB:
+        _cache_evict_lru(REPORT_CACHE_FOLDER, int(REPORT_CACHE_MAX_MB * 1024 * 1024))
+    return path
 
-def _fit_ellipsis(text, max_width_pt, font_name="Helvetica", font_size=9, ellipsis="…"):
+# -----------------------------
+# Source text helpers (local PDF + URL fallback with cache)
+# -----------------------------
+def _pdf_extract_text_bounded(pdf_file, max_chars: int = 200_000) -> str:
     """
-    Return text that fits into max_width_pt (points) using the given font,
-    truncating with an ellipsis if needed.
+    pdfminer's extract_text, but stops after the page that reaches max_chars
+    instead of laying out the rest of a long regulation we'd cut off anyway.
     """
-    if text is None:
-        return ""
-    text = str(text)
-    if stringWidth(text, font_name, font_size) <= max_width_pt:
-        return text
-    # Make sure even just the ellipsis fits
-    if stringWidth(ellipsis, font_name, font_size) > max_width_pt:
-        return ""  # nothing fits cleanly
-    # Binary search for the longest prefix that fits with ellipsis
-    lo, hi = 0, len(text)
-    while lo < hi:
-        mid = (lo + hi + 1) // 2
-        candidate = text[:mid] + ellipsis
-        if stringWidth(candidate, font_name, font_size) <= max_width_pt:
-            lo = mid
-        else:
-            hi = mid - 1
-    return text[:lo] + ellipsis
-
-def _collect_summary(rows):
-    total = len(rows)
-    ok_elems = fail_elems = missing_elems = 0
-    for r in rows:
-        checks = r.get("checks") or {}
-        vals   = r.get("Values") or {}
-        considered = {k: checks.get(k) for k, v in vals.items() if v is not None}
-        if not considered:
-            missing_elems += 1
-        elif all(v is True for v in considered.values()):
-            ok_elems += 1
-        elif any(v is False for v in considered.values()):
-            fail_elems += 1
-        else:
-            missing_elems += 1
-    return total, ok_elems, fail_elems, missing_elems
-
-def _flatten_rows_for_detailed_table(rows, standards, ops_map, ranges_map):
-    out = []
-    for r in rows:
-        short   = r.get("Short") or ""
-        ifctype = r.get("IfcType") or ""
-        gid     = _short_gid(r.get("GlobalId") or "")
-        vals    = r.get("Values") or {}
-        checks  = r.get("checks") or {}
-        for attr, val in vals.items():
-            if val is None:
-                continue
-            op = (ops_map.get(attr) or "").strip()
-            std_txt = "-"
-            if attr == "Bahnsteighöhe (m)" and op == "range":
-                mn = standards.get("Bahnsteighöhe min (m)")
-                mx = standards.get("Bahnsteighöhe max (m)")
-                if mn is not None or mx is not None:
-                    std_txt = f"{mn if mn is not None else '–'}–{mx if mx is not None else '–'}"
-            elif op == "range":
-                rng = ranges_map.get(attr) or {}
-                mn, mx = rng.get("min"), rng.get("max")
-                if mn is not None or mx is not None:
-                    std_txt = f"{mn if mn is not None else '–'}–{mx if mx is not None else '–'}"
-            else:
-                v = standards.get(attr)
-                if v is not None:
-                    std_txt = f"{v}"
-            mark = _status_mark(checks.get(attr))
-            out.append([short, ifctype, gid, attr, val, std_txt, (op or "—"), mark])
-    return out
-
-from reportlab.lib.pagesizes import A4  # make sure this import exists at top
-
-def _make_header_footer(page_count):
-    def _header_footer(canvas: Canvas, doc):
-        canvas.saveState()
-        w, h = A4
-        # --- draw logos ---
-        # Left: DB InfraGO
-        if DB_LOGO_IMG:
-            # ~22mm wide, ~8mm high, keep aspect
-            canvas.drawImage(
-                DB_LOGO_IMG,
-                15*mm,               # x
-                h - 14*mm,           # y (top area)
-                width=22*mm,
-                height=8*mm,
-                preserveAspectRatio=True,
-                mask='auto'
-            )
+    with open_filename(pdf_file, "rb") as fp, StringIO() as out:
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = TextConverter(rsrcmgr, out, laparams=LAParams())
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for page in PDFPage.get_pages(fp, caching=True):
+            interpreter.process_page(page)
+            if out.tell() >= max_chars:
+                break
+        return out.getvalue()[:max_chars]
 
-        # Right: UDE logo
-        if UDE_LOGO_IMG:
-            # ~28mm wide, ~8mm high, keep aspect
-            canvas.drawImage(
-                UDE_LOGO_IMG,
-                w - 15*mm - 28*mm,   # x (flush right with 15mm margin)
-                h - 14*mm,           # y
-                width=28*mm,
-                height=8*mm,
-                preserveAspectRatio=True,
-                mask='auto'
-            )
-        # top rule
-        canvas.setStrokeColorRGB(0.90, 0.90, 0.92)
-        canvas.setLineWidth(0.6)
-        canvas.line(15*mm, h-15*mm, w-15*mm, h-15*mm)
-        # repeating small title
-        canvas.setFont("Helvetica", 9)
-        canvas.setFillColorRGB(0.10, 0.10, 0.10)
-        canvas.drawString(15*mm, h-19*mm, "Prüfbericht: Automatisierte fachliche Prüfung (IFC-BIM)")
-        # --- footer: line, wrapped legal, page X of Y on its own line ---
-        canvas.setStrokeColorRGB(0.90, 0.90, 0.92)
-        canvas.line(15*mm, 18*mm, w-15*mm, 18*mm)  # move line up for breathing room
-
-        legal_font = "Helvetica"
-        legal_size = 6.8
-        canvas.setFont(legal_font, legal_size)
-        canvas.setFillColorRGB(0.30, 0.30, 0.30)
-
-        left_x   = 15*mm
-        right_x  = w - 15*mm
-        max_legal_width = right_x - left_x
-
-        legal_lines = _wrap_to_width(LEGAL_FOOTER, max_legal_width, legal_font, legal_size)[:2]
-        # draw legal lines
-        if legal_lines:
-            canvas.drawString(left_x, 12*mm, legal_lines[0])
-        if len(legal_lines) > 1:
-            canvas.drawString(left_x, 9*mm, legal_lines[1])
-
-        # page number on its own line, right aligned
-        canvas.setFont("Helvetica", 8)
-        canvas.setFillColorRGB(0.20, 0.20, 0.20)
-        y_total = page_count if page_count else ""
-        page_txt = f"Seite {canvas.getPageNumber()} von {y_total}".strip()
-        canvas.drawRightString(right_x, 9*mm, page_txt)
-
-    return _header_footer
-
-def _generate_results_pdf_report(payload, title="Prüfbericht: Automatisierte fachliche Prüfung (IFC-BIM)"):
-    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, BaseDocTemplate, PageTemplate, Frame
-    styles = getSampleStyleSheet()
-
-    rows       = payload.get("rows") or []
-    standards  = payload.get("standards") or {}
-    ops_map    = payload.get("_ops") or {}
-    ranges_map = payload.get("_ranges") or {}
-
-    total, ok_elems, fail_elems, missing_elems = _collect_summary(rows)
-
-    # Styles
-    h1 = styles['Title']; h1.fontName="Helvetica-Bold"; h1.fontSize=18; h1.leading=22
-    p  = styles['BodyText']; p.fontName="Helvetica"; p.fontSize=10.5; p.leading=14
-    small = styles['BodyText'].clone('small'); small.fontSize=9; small.leading=12; small.textColor=colors.HexColor("#555")
-
-    # Build a FRESH story every time (important: flowables are stateful!)
-    def _build_story():
-        story = []
-        story.append(Paragraph(title, h1))
-        story.append(Spacer(1, 6))
-        story.append(Paragraph("Sehr geehrte Damen und Herren,", p))
-        story.append(Spacer(1, 4))
-        story.append(Paragraph(
-            f"Dieser Bericht fasst die Ergebnisse der automatisierten fachlichen Prüfung des IFC-Modells zusammen. "
-            f"Von insgesamt <b>{total}</b> geprüften Elementen erfüllen <b>{ok_elems}</b> die vorgegebenen Anforderungen. "
-            f"<b>{fail_elems}</b> Elemente erfüllen die Anforderungen nicht. "
-            f"Für <b>{missing_elems}</b> Elemente fehlen erforderliche Werte oder klare Vergleichsregeln.", p))
-        story.append(Spacer(1, 8))
-        story.append(Paragraph(
-            "Prüfgrundlage: Die automatischen Grenzwerte orientieren sich an den hinterlegten Normen/Regelwerken "
-            "im Adminbereich; die genaue rechtliche Bewertung obliegt der zuständigen Aufsichtsbehörde.", small))
-        story.append(Spacer(1, 10))
-
-        legend = Table([["Legende", "✓ = konform", "✗ = nicht konform", "– = nicht bewertet"]],
-                       style=TableStyle([
-                           ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
-                           ("FONTSIZE", (0,0), (-1,-1), 9),
-                           ("TEXTCOLOR", (0,0), (0,0), colors.HexColor("#111")),
-                           ("TEXTCOLOR", (1,0), (-1,0), colors.HexColor("#444")),
-                           ("BACKGROUND", (0,0), (0,0), colors.HexColor("#F2F4F7")),
-                           ("LINEABOVE", (0,0), (-1,0), 0.25, colors.HexColor("#E5E7EB")),
-                           ("LINEBELOW", (0,0), (-1,0), 0.25, colors.HexColor("#E5E7EB")),
-                           ("LEFTPADDING", (0,0), (-1,-1), 6),
-                           ("RIGHTPADDING", (0,0), (-1,-1), 6),
-                           ("TOPPADDING", (0,0), (-1,-1), 4),
-                           ("BOTTOMPADDING", (0,0), (-1,-1), 4),
-                       ]))
-        story.append(legend)
-        story.append(Spacer(1, 12))
-
-        table_data = [["Objekt", "IFC-Typ", "GlobalId", "Attribut", "Wert", "Grenzwert", "Operator", "Ergebnis"]]
-        table_data += _flatten_rows_for_detailed_table(rows, standards, ops_map, ranges_map)
-
-        # --- column widths (points) ---
-        col_widths = [22*mm, 26*mm, 28*mm, 50*mm, 18*mm, 24*mm, 18*mm, 14*mm]
-
-        # --- truncate IFC-Typ with ellipsis to fit the column ---
-        ifc_col_idx = 1  # "IFC-Typ"
-        # Table paddings are ~4pt left + 4pt right -> subtract a bit
-        available_pt = col_widths[ifc_col_idx] - 8
-        for i in range(1, len(table_data)):  # skip the header row
-            cell_text = table_data[i][ifc_col_idx]
-            table_data[i][ifc_col_idx] = _fit_ellipsis(cell_text, available_pt, font_name="Helvetica", font_size=9)
-
-        # --- build table ---
-        tbl = Table(table_data, repeatRows=1, colWidths=col_widths)
-        tbl.setStyle(TableStyle([
-            ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
-            ("FONTSIZE", (0,0), (-1,-1), 9),
-            ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#F2F4F7")),
-            ("TEXTCOLOR", (0,0), (-1,0), colors.HexColor("#111111")),
-            ("LINEABOVE", (0,0), (-1,0), 0.75, colors.HexColor("#E5E7EB")),
-            ("LINEBELOW", (0,0), (-1,0), 0.75, colors.HexColor("#E5E7EB")),
-            ("GRID", (0,0), (-1,-1), 0.25, colors.HexColor("#E5E7EB")),
-            ("ALIGN", (4,1), (5,-1), "RIGHT"),
-            ("ALIGN", (6,1), (7,-1), "CENTER"),
-            ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-            ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.white, colors.HexColor("#FBFBFD")]),
-            ("LEFTPADDING", (0,0), (-1,-1), 4),
-            ("RIGHTPADDING", (0,0), (-1,-1), 4),
-            ("TOPPADDING", (0,0), (-1,-1), 3),
-            ("BOTTOMPADDING", (0,0), (-1,-1), 3),
-        ]))
-        story.append(tbl)
-        story.append(Spacer(1, 12))
-        story.append(Paragraph("Mit freundlichen Grüßen", p))
-        story.append(Spacer(1, 14))
-        return story
-
-    def _render(flowables, page_count_override=None):
-        buf = BytesIO()
-        doc = BaseDocTemplate(buf, pagesize=A4,
-                              leftMargin=18*mm, rightMargin=18*mm,
-                              topMargin=30*mm, bottomMargin=26*mm)
-        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
-        doc.addPageTemplates([
-            PageTemplate(id='All', frames=[frame], onPage=_make_header_footer(page_count_override))
-        ])
-        doc.build(flowables)
-        pages = doc.canv.getPageNumber()
-        buf.seek(0)
-        return buf, pages
-
-    # Pass 1: count pages (fresh story)
-    tmp_buf, total_pages = _render(_build_story(), page_count_override=None)
-
-    # Pass 2: final render with "von Y" (fresh story)
-    final_buf, _ = _render(_build_story(), page_count_override=total_pages)
-    final_buf.seek(0)
-    return final_buf
+def _cache_name_for_pdf(path: str) -> str:
+    """Text cache file for a local PDF; name, mtime and size invalidate it."""
+    st = os.stat(path)
+    raw = f"{os.path.basename(path)}\0{st.st_mtime_ns}\0{st.st_size}"
+    os.makedirs(PDF_TEXT_CACHE_FOLDER, exist_ok=True)
+    return os.path.join(PDF_TEXT_CACHE_FOLDER, hashlib.sha1(raw.encode("utf-8")).hexdigest() + ".txt")
 
-# -----------------------------
-# Source text helpers (local PDF + URL fallback with cache)
-# -----------------------------
-def _pdf_text_from_local(filename: str) -> str | None:
+def _pdf_text_from_local(filename: str, limit: int = 200_000) -> str | None:
     try:
         path = os.path.join(UPLOAD_SRC_FOLDER, filename)
         if not os.path.isfile(path):
             return None
-        txt = pdf_extract_text(path) or ""
-        return txt[:200_000]
+        txt_path = _cache_name_for_pdf(path)
+        hit = os.path.exists(txt_path)
+        metrics.cache("pdf_text", hit)
+        if hit:
+            with open(txt_path, "r", encoding="utf-8") as f:
+                return f.read()[:limit]
+        with metrics.span("pdf_text"):
+            txt = _pdf_extract_text_bounded(path, limit) or ""
+        fd, tmp = tempfile.mkstemp(dir=PDF_TEXT_CACHE_FOLDER, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as wf:
+            wf.write(txt)
+        os.replace(tmp, txt_path)
+        return txt
     except Exception:
         return None
 
@@ -538,9 +450,11 @@ def _text_from_url(url: str, limit: int = 200_000) -> str | None:
             with open(txt_path, "r", encoding="utf-8") as f:
                 cached = f.read()
                 if cached:
+                    metrics.cache("url", True)
                     return cached[:limit]
         except Exception:
             pass
+    metrics.cache("url", False)
 
     headers = {
         "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -551,7 +465,8 @@ def _text_from_url(url: str, limit: int = 200_000) -> str | None:
         "Connection": "close",
     }
     try:
-        resp = requests.get(url, headers=headers, timeout=(7, 25), allow_redirects=True)
+        with metrics.span("url_fetch"):
+            resp = requests.get(url, headers=headers, timeout=(7, 25), allow_redirects=True)
         if resp.status_code != 200 or not resp.content:
             return None
 
@@ -561,7 +476,8 @@ def _text_from_url(url: str, limit: int = 200_000) -> str | None:
         if is_pdf:
             data = resp.content[:10_000_000]  # cap 10MB
             try:
-                text = pdf_extract_text(BytesIO(data)) or ""
+                with metrics.span("pdf_text"):
+                    text = _pdf_extract_text_bounded(BytesIO(data), limit) or ""
             except Exception:
                 text = ""
         else:
@@ -577,16 +493,167 @@ def _text_from_url(url: str, limit: int = 200_000) -> str | None:
     except requests.RequestException:
         return None
 
+# -----------------------------
+# Retrieval (BM25 over chunks of a source text)
+# -----------------------------
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+def _bm25_tokens(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", text.lower().translate(_UMLAUTS))
+
+def _chunk_text(text: str, size: int, overlap: int) -> list:
+    """Split into ~size char chunks, preferring paragraph/line breaks as cut points."""
+    chunks, start, n = [], 0, len(text)
+    while start < n:
+        end = min(n, start + size)
+        if end < n:
+            cut = max(text.rfind("\n\n", start + size // 2, end), text.rfind("\n", start + size // 2, end))
+            if cut > start:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= n:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+def _bm25_index(text: str) -> dict:
+    """Chunked BM25 index of a source text, persisted by text hash in RETRIEVAL_INDEX_FOLDER."""
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest() + f"-c{RETRIEVAL_CHUNK_CHARS}"
+    index = _cache_get_json(RETRIEVAL_INDEX_FOLDER, key)
+    metrics.cache("retrieval_index", index is not None)
+    if index is not None:
+        return index
+    chunks = _chunk_text(text, RETRIEVAL_CHUNK_CHARS, RETRIEVAL_CHUNK_CHARS // 6)
+    tfs, df = [], {}
+    for chunk in chunks:
+        tf = {}
+        for tok in _bm25_tokens(chunk):
+            tf[tok] = tf.get(tok, 0) + 1
+        for tok in tf:
+            df[tok] = df.get(tok, 0) + 1
+        tfs.append(tf)
+    lens = [sum(tf.values()) for tf in tfs]
+    index = {"chunks": chunks, "tf": tfs, "df": df, "lens": lens,
+             "avgdl": (sum(lens) / len(lens)) if lens else 0.0}
+    _cache_put_json(RETRIEVAL_INDEX_FOLDER, key, index, int(RETRIEVAL_INDEX_MAX_MB * 1024 * 1024))
+    return index
+
+def _bm25_top_chunks(index: dict, query_terms: list, k: int, k1: float = 1.5, b: float = 0.75) -> list:
+    """
+    Indices of the k best chunks. A query term also matches longer vocabulary
+    terms containing it, so "breite" finds German compounds like "rampenbreite".
+    """
+    n_docs = len(index["chunks"])
+    if not n_docs:
+        return []
+    df, avgdl = index["df"], index["avgdl"] or 1.0
+    terms = set()
+    for q in set(query_terms):
+        if len(q) < 3:
+            if q in df:
+                terms.add(q)
+            continue
+        terms.update(t for t in df if q in t)
+    idf = {t: math.log(1 + (n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in terms}
+    scores = []
+    for i, tf in enumerate(index["tf"]):
+        dl = index["lens"][i]
+        score = 0.0
+        for t in terms:
+            f = tf.get(t)
+            if f:
+                score += idf[t] * f * (k1 + 1) / (f + k1 * (1 - b + b * dl / avgdl))
+        if score > 0:
+            scores.append((score, i))
+    scores.sort(reverse=True)
+    return [i for _, i in scores[:k]]
+
+def _attr_query_terms(attribute_label: str) -> list:
+    """Label (without unit) + its TARGETS synonyms + the object it belongs to."""
+    words = [re.sub(r"\(.*?\)", " ", attribute_label)]
+    for tgt in TARGETS:
+        if attribute_label in tgt["keys"]:
+            words.extend(tgt["keys"][attribute_label])
+            words.append(tgt["short"])
+    if attribute_label.startswith("Bahnsteighöhe"):
+        words.append("Bahnsteig")
+    return [t for w in words for t in _bm25_tokens(w)]
+
+def _context_for_attr(attribute_label: str, text: str, mode: str | None = None) -> str:
+    """
+    Prompt context for one attribute. "retrieval" keeps only the top-k BM25
+    chunks (in document order); "full" is the old behaviour, first 160k chars.
+    """
+    mode = mode or AI_CONTEXT_MODE
+    if mode != "retrieval":
+        return text[:160_000]
+    index = _bm25_index(text)
+    top = _bm25_top_chunks(index, _attr_query_terms(attribute_label), RETRIEVAL_TOP_K)
+    if not top:
+        return text[:RETRIEVAL_TOP_K * RETRIEVAL_CHUNK_CHARS]
+    return "\n[…]\n".join(index["chunks"][i] for i in sorted(top))
+
 # -----------------------------
 # AI helpers
 # -----------------------------
+def _ai_cache_key(attribute_label: str, text: str) -> str:
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    context = AI_CONTEXT_MODE if AI_CONTEXT_MODE != "retrieval" else f"retrieval:{RETRIEVAL_TOP_K}:{RETRIEVAL_CHUNK_CHARS}"
+    raw = f"{attribute_label}\0{text_hash}\0{AI_MODEL}\0{AI_PROMPT_VERSION}\0{context}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _ai_cache_get(key):
+    """
+    Cached extraction as (hit, result); entries older than AI_CACHE_TTL_HOURS
+    (AI_CACHE_NEGATIVE_TTL_HOURS for a None result) miss.
+    """
+    entry = _cache_get_json(AI_CACHE_FOLDER, key)
+    if not entry:
+        return False, None
+    result = entry.get("result")
+    if result is None:
+        if time.time() - entry.get("created", 0) > AI_CACHE_NEGATIVE_TTL_HOURS * 3600:
+            return False, None
+    elif AI_CACHE_TTL_HOURS and time.time() - entry.get("created", 0) > AI_CACHE_TTL_HOURS * 3600:
+        return False, None
+    return True, result
+
+def ai_cache_stats():
+    count = size = 0
+    if os.path.isdir(AI_CACHE_FOLDER):
+        for entry in os.scandir(AI_CACHE_FOLDER):
+            if entry.is_file():
+                count += 1
+                size += entry.stat().st_size
+    return {"entries": count, "bytes": size}
+
+def clear_ai_cache():
+    removed = 0
+    if os.path.isdir(AI_CACHE_FOLDER):
+        for entry in os.scandir(AI_CACHE_FOLDER):
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
 def _ai_extract_attr_from_text(client, attribute_label: str, text: str) -> dict | None:
     """
     Ask the model for a compact, structured extraction + a ready-to-show German sentence.
+    Answers are cached on disk by (attribute, source text, model, prompt version).
     """
     if not text or not attribute_label:
         return None
 
+    cache_key = _ai_cache_key(attribute_label, text)
+    hit, cached = _ai_cache_get(cache_key)
+    metrics.cache("ai", hit)
+    if hit:
+        return cached
+
     prompt = f"""
 Du bist ein Leser von technischen Normen im Bahnbereich. Extrahiere die eindeutige
 numerische Vorgabe für das Attribut "{attribute_label}" aus dem KONTEXT. Wenn es mehrere
@@ -625,27 +692,95 @@ Beispiele:
 }}
 
 KONTEXT (gekürzt):
-{text[:160_000]}
+{_context_for_attr(attribute_label, text)}
 """
     try:
-        resp = client.responses.create(
-            model="gpt-4o-mini",
-            temperature=0,
-            input=prompt
-        )
-        raw = (resp.output_text or "").strip()
-        start, end = raw.find("{"), raw.rfind("}")
-        if start >= 0 and end > start:
-            import json
-            return json.loads(raw[start:end+1])
+        with metrics.span("openai"):
+            resp = client.responses.create(
+                model=AI_MODEL,
+                temperature=0,
+                input=prompt,
+                timeout=AI_CALL_TIMEOUT,
+            )
     except Exception:
-        pass
-    return None
+        return None
+
+    result = None
+    raw = (resp.output_text or "").strip()
+    start, end = raw.find("{"), raw.rfind("}")
+    if start >= 0 and end > start:
+        try:
+            result = json.loads(raw[start:end+1])
+        except ValueError:
+            result = None
+    # "no usable answer" is remembered briefly too (see _ai_cache_get), so retries don't hammer the API
+    if result is not None or AI_CACHE_NEGATIVE_TTL_HOURS:
+        _cache_put_json(AI_CACHE_FOLDER, cache_key, {"created": time.time(), "result": result},
+                        int(AI_CACHE_MAX_MB * 1024 * 1024))
+    return result
+
+def _ai_source_for_attr(attr: str, src: dict) -> dict | None:
+    """
+    Load the source text for one attribute (local PDF first, then the link) and
+    ask the model for a compact, human-friendly sentence + short quote.
+    """
+    file = src.get("file")
+    link = (src.get("link") or "").strip()
+
+    # 1) Prefer local PDF if present
+    text = _pdf_text_from_local(file) if file else None
+    # 2) Otherwise try the link (PDF or HTML)
+    if (not text) and link:
+        text = _text_from_url(link)
+
+    if not text:
+        return None
+
+    res = _ai_extract_attr_from_text(client, attr, text)
+    if not res:
+        return None
+
+    # Build sentence if model didn't provide one
+    unit = (res.get("unit") or "").strip()
+    rule = (res.get("rule") or "").strip().lower()
+    law = (res.get("law") or res.get("title") or "Quelle").strip()
+    section = (res.get("section") or "").strip()
+    modality = (res.get("modality") or "must").lower()
+    verb = "muss" if modality == "must" else "sollte"
+    condition = (res.get("condition") or "").strip()
+
+    core = None
+    if rule == "range" and res.get("min") is not None and res.get("max") is not None:
+        core = f"{verb} {attr} zwischen {res['min']} und {res['max']} {unit} liegen"
+    elif rule == "min" and res.get("value") is not None:
+        core = f"{verb} mindestens {res['value']} {unit} betragen"
+    elif rule == "max" and res.get("value") is not None:
+        core = f"{verb} höchstens {res['value']} {unit} betragen"
+    elif rule == "target" and res.get("value") is not None:
+        core = f"soll {res['value']} {unit} betragen"
+
+    if core and condition:
+        core = f"{core} ({condition})"
+
+    if res.get("sentence_de"):
+        sentence = res["sentence_de"]
+    elif core:
+        sentence = f"Laut {law}" + (f" (Abschnitt {section})" if section else "") + f": {core}."
+    else:
+        sentence = f"Laut {law}" + (f" (Abschnitt {section})" if section else "") + " liegt eine relevante Vorgabe vor."
+
+    return {
+        "summary": sentence,
+        "evidence": res.get("quote") or res.get("evidence"),
+        "confidence": res.get("confidence"),
+    }
 
 def _ai_extract_for_results_local(rows: list, standards: dict) -> dict:
     """
     For each attribute in the current results, try to read from a local PDF OR a link
     and ask AI for a compact, human-friendly sentence + short quote.
+    Attributes are handled concurrently (AI_CONCURRENCY); whatever is not done
+    after AI_TOTAL_TIMEOUT seconds is cancelled and simply left out.
     """
     out = {}
     sources = standards.get("_sources", {}) or {}
@@ -656,209 +791,1039 @@ def _ai_extract_for_results_local(rows: list, standards: dict) -> dict:
             if v is not None:
                 needed.add(k)
 
-    for attr in needed:
+    def _has_source(attr):
         src = sources.get(attr) or {}
-        file = src.get("file")
-        link = (src.get("link") or "").strip()
+        return bool(src.get("file") or (src.get("link") or "").strip())
 
-        # 1) Prefer local PDF if present
-        text = _pdf_text_from_local(file) if file else None
-        # 2) Otherwise try the link (PDF or HTML)
-        if (not text) and link:
-            text = _text_from_url(link)
+    needed = [attr for attr in sorted(needed) if _has_source(attr)]
+    if not needed:
+        return out
 
-        if not text:
+    pool = ThreadPoolExecutor(max_workers=max(1, min(AI_CONCURRENCY, len(needed))),
+                              thread_name_prefix="ai-source")
+    futures = {pool.submit(_ai_source_for_attr, attr, sources.get(attr) or {}): attr for attr in needed}
+    with metrics.span("ai_sources"):
+        done, pending = wait(futures, timeout=AI_TOTAL_TIMEOUT)
+    for fut in pending:
+        fut.cancel()
+    # don't wait for calls that are still running; their results are dropped
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    for fut in done:
+        try:
+            res = fut.result()
+        except Exception:
             continue
+        if res:
+            out[futures[fut]] = res
 
-        res = _ai_extract_attr_from_text(client, attr, text)
-        if not res:
-            continue
+    return out
+
+_ifc_pool = {"pid": None, "executor": None}
+_ifc_pool_lock = threading.Lock()
+
+def _get_ifc_pool():
+    """Process pool for _parse_and_check, created lazily once per (gunicorn) process."""
+    with _ifc_pool_lock:
+        if _ifc_pool["pid"] != os.getpid() or _ifc_pool["executor"] is None:
+            # spawn, not fork: the parent runs Flask and worker threads
+            _ifc_pool["executor"] = ProcessPoolExecutor(
+                max_workers=IFC_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _ifc_pool["pid"] = os.getpid()
+        return _ifc_pool["executor"]
+
+def _run_in_ifc_pool(fn, *args):
+    """
+    Run fn (returning packed rows and its recorded metrics) in the process pool,
+    or inline if IFC_PROCESS_WORKERS is 0.
+    """
+    if IFC_PROCESS_WORKERS <= 0:
+        blob, recorded = fn(*args)
+        metrics.merge(recorded)
+        return _unpack_rows(blob)
+    pool = _get_ifc_pool()
+    try:
+        with metrics.span("ifc_pool"):
+            blob, recorded = pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        # a child died (e.g. crashed in the IFC parser); start fresh next time
+        with _ifc_pool_lock:
+            if _ifc_pool["executor"] is pool:
+                _ifc_pool["executor"] = None
+        raise RuntimeError("IFC-Verarbeitung abgebrochen (Worker-Prozess beendet).")
+    metrics.merge(recorded)  # spans of the child (open, extract, check) and its cache lookups
+    return _unpack_rows(blob)
+
+def parse_and_check(filepath, digest, standards, rules=None):
+    """Extract and check one IFC file in the process pool."""
+    return _run_in_ifc_pool(_parse_and_check, filepath, digest, standards, rules)
+
+def run_check_pipeline(filepath, digest):
+    """Extract, check and annotate one IFC file; everything the results page needs."""
+    standards, version = standards_snapshot()
+    rows = parse_and_check(filepath, digest, standards, get_compiled_rules(standards, version))
+    columns = compute_table_columns(rows)
+    ai_sources = _ai_extract_for_results_local(rows, standards)
+    return {
+        "rows": rows,
+        "columns": columns,
+        "standards": standards,
+        "standards_version": version,
+        "ai_sources": ai_sources,
+    }
+
+def run_batch_pipeline(files):
+    """
+    Check several stored IFC files against one standards snapshot, in parallel
+    across the process pool. Rows are merged (each tagged with "File") and every
+    file gets a summary entry; a file that fails only marks its own entry.
+    """
+    standards, version = standards_snapshot()
+    rules = get_compiled_rules(standards, version)
+    rows, summaries = [], []
+    with ThreadPoolExecutor(max_workers=max(1, IFC_PROCESS_WORKERS), thread_name_prefix="batch") as ex:
+        futures = [ex.submit(parse_and_check, f["filepath"], f["digest"], standards, rules) for f in files]
+        for f, fut in zip(files, futures):
+            entry = {"filename": f["filename"], "digest": f["digest"], "error": None}
+            try:
+                file_rows = fut.result()
+            except Exception as e:
+                entry["error"] = str(e)
+                file_rows = []
+            for r in file_rows:
+                r["File"] = f["filename"]
+            entry["total"], entry["ok"], entry["fail"], entry["missing"] = _collect_summary(file_rows)
+            summaries.append(entry)
+            rows.extend(file_rows)
+    if all(e["error"] for e in summaries):
+        raise RuntimeError("; ".join(f'{e["filename"]}: {e["error"]}' for e in summaries))
+    return {
+        "rows": rows,
+        "columns": compute_table_columns(rows),
+        "standards": standards,
+        "standards_version": version,
+        "ai_sources": _ai_extract_for_results_local(rows, standards),
+        "files": summaries,
+    }
+
+def run_revision_pipeline(filepath, digest, baseline_id):
+    """
+    Check a new revision of a model against a stored baseline result. Rows are
+    matched by GlobalId; unchanged elements keep the baseline's checks when it
+    was checked with the current standards, so only added and changed elements
+    are evaluated. The result carries a "diff" summary (see summarize_diff).
+    """
+    baseline = load_result(baseline_id)
+    if baseline is None:
+        raise RuntimeError("Vergleichsergebnis ist abgelaufen.")
+    if baseline["files"]:
+        raise RuntimeError("Ein Stapelergebnis kann nicht als Vergleich dienen.")
+    standards, version = standards_snapshot()
+    rows = _run_in_ifc_pool(_parse_only, filepath, digest)
+    diff = diff_rows(baseline["rows"], rows)
+    if baseline["standards_version"] == version:
+        for r, b in diff["unchanged"]:
+            r["checks"] = b["checks"]
+        reused = len(diff["unchanged"])
+        check_rows(diff["added"] + [r for r, _ in diff["changed"]], standards, get_compiled_rules(standards, version))
+    else:
+        reused = 0
+        check_rows(rows, standards, get_compiled_rules(standards, version))
+    summary = summarize_diff(diff)
+    summary.update(baseline=baseline_id, baseline_filename=baseline["filename"], reused_checks=reused)
+    return {
+        "rows": rows,
+        "columns": compute_table_columns(rows),
+        "standards": standards,
+        "standards_version": version,
+        "ai_sources": _ai_extract_for_results_local(rows, standards),
+        "diff": summary,
+    }
+
+# -----------------------------
+# Result store (SQLite, rows kept server-side)
+# -----------------------------
+def _results_db():
+    conn = sqlite3.connect(RESULTS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS results (
+            id                TEXT PRIMARY KEY,
+            created           REAL NOT NULL,
+            accessed          REAL NOT NULL,
+            filename          TEXT,
+            digest            TEXT,              -- sha256 of the uploaded IFC
+            standards         TEXT NOT NULL,     -- JSON snapshot used for the checks
+            standards_version TEXT,
+            columns           TEXT NOT NULL,     -- JSON list
+            ai_sources        TEXT,              -- JSON dict
+            row_count         INTEGER NOT NULL,
+            files             TEXT,              -- JSON per-file summaries of a batch
+            diff              TEXT               -- JSON summarize_diff against a baseline result
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS report_keys (
+            result_id         TEXT NOT NULL REFERENCES results (id) ON DELETE CASCADE,
+            mode              TEXT NOT NULL,
+            standards_version TEXT NOT NULL,
+            template_version  INTEGER NOT NULL,  -- REPORT_TEMPLATE_VERSION
+            key               TEXT NOT NULL,     -- report_cache_key, the report's ETag
+            PRIMARY KEY (result_id, mode, standards_version, template_version)
+        ) WITHOUT ROWID""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS result_rows (
+            result_id  TEXT NOT NULL REFERENCES results (id) ON DELETE CASCADE,
+            idx        INTEGER NOT NULL,
+            short      TEXT,
+            ifctype    TEXT,
+            global_id  TEXT,
+            name       TEXT,
+            status     TEXT,                     -- ok | fail | missing, see _row_status
+            attrs      TEXT,                     -- "|attr|attr|" of non-empty values
+            vals       TEXT NOT NULL,            -- JSON "Values"
+            checks     TEXT NOT NULL,            -- JSON "checks"
+            file       TEXT,                     -- source file name within a batch
+            PRIMARY KEY (result_id, idx)
+        ) WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+    # default order of the results page / rows API
+    conn.execute("CREATE INDEX IF NOT EXISTS result_rows_short ON result_rows (result_id, short, idx)")
+    _add_missing_columns(conn, "results", {"files": "TEXT", "diff": "TEXT"})
+    _add_missing_columns(conn, "result_rows", {"file": "TEXT"})
+    return conn
+
+def _add_missing_columns(conn, table, columns):
+    """Bring a table created by an older version up to date (columns: name -> SQL type)."""
+    have = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in have:
+            try:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+            except sqlite3.OperationalError:
+                pass  # added by a concurrent connection
+
+def _row_record(result_id, idx, r):
+    vals = r.get("Values") or {}
+    attrs = "|" + "|".join(k for k, v in vals.items() if v is not None) + "|"
+    return (result_id, idx, r.get("Short"), r.get("IfcType"), r.get("GlobalId"), r.get("Name"),
+            _row_status(r), attrs, json.dumps(vals, ensure_ascii=False),
+            json.dumps(r.get("checks") or {}, ensure_ascii=False), r.get("File"))
+
+def _row_from_record(rec):
+    row = {
+        "Short": rec["short"],
+        "IfcType": rec["ifctype"],
+        "GlobalId": rec["global_id"],
+        "Name": rec["name"],
+        "Values": json.loads(rec["vals"]),
+        "checks": json.loads(rec["checks"]),
+    }
+    if rec["file"] is not None:
+        row["File"] = rec["file"]
+    return row
+
+def save_result(result, filename=None, digest=None):
+    """Store a run_check_pipeline result; returns its id. Expired results are dropped."""
+    result_id = uuid.uuid4().hex
+    now = time.time()
+    rows = result["rows"]
+    with closing(_results_db()) as db:
+        db.execute("BEGIN IMMEDIATE")
+        db.execute("INSERT INTO results (id, created, accessed, filename, digest, standards, standards_version, "
+                   "columns, ai_sources, row_count, files, diff) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                   (result_id, now, now, filename, digest,
+                    json.dumps(result["standards"], ensure_ascii=False), result.get("standards_version"),
+                    json.dumps(result["columns"], ensure_ascii=False),
+                    json.dumps(result.get("ai_sources") or {}, ensure_ascii=False), len(rows),
+                    json.dumps(result["files"], ensure_ascii=False) if result.get("files") else None,
+                    json.dumps(result["diff"], ensure_ascii=False) if result.get("diff") else None))
+        db.executemany("INSERT INTO result_rows (result_id, idx, short, ifctype, global_id, name, status, attrs, "
+                       "vals, checks, file) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (_row_record(result_id, i, r) for i, r in enumerate(rows)))
+        db.execute("DELETE FROM results WHERE accessed < ?", (now - RESULT_TTL_HOURS * 3600,))
+        db.execute("COMMIT")
+    return result_id
+
+def load_result_meta(result_id):
+    """Everything about a stored result except its rows (None if unknown/expired)."""
+    if not result_id:
+        return None
+    with closing(_results_db()) as db:
+        rec = db.execute("SELECT * FROM results WHERE id = ?", (result_id,)).fetchone()
+        if not rec:
+            return None
+        db.execute("UPDATE results SET accessed = ? WHERE id = ?", (time.time(), result_id))
+    meta = dict(rec)
+    for key in ("standards", "columns", "ai_sources", "files", "diff"):
+        meta[key] = json.loads(meta[key]) if meta[key] else None
+    return meta
+
+def iter_result_rows(result_id, batch_size=1000):
+    """Yield the stored rows in extraction order without loading them all at once."""
+    with closing(_results_db()) as db:
+        cur = db.execute("SELECT * FROM result_rows WHERE result_id = ? ORDER BY idx", (result_id,))
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            for rec in batch:
+                yield _row_from_record(rec)
 
-        # Build sentence if model didn't provide one
-        unit = (res.get("unit") or "").strip()
-        rule = (res.get("rule") or "").strip().lower()
-        law = (res.get("law") or res.get("title") or "Quelle").strip()
-        section = (res.get("section") or "").strip()
-        modality = (res.get("modality") or "must").lower()
-        verb = "muss" if modality == "must" else "sollte"
-        condition = (res.get("condition") or "").strip()
-
-        core = None
-        if rule == "range" and res.get("min") is not None and res.get("max") is not None:
-            core = f"{verb} {attr} zwischen {res['min']} und {res['max']} {unit} liegen"
-        elif rule == "min" and res.get("value") is not None:
-            core = f"{verb} mindestens {res['value']} {unit} betragen"
-        elif rule == "max" and res.get("value") is not None:
-            core = f"{verb} höchstens {res['value']} {unit} betragen"
-        elif rule == "target" and res.get("value") is not None:
-            core = f"soll {res['value']} {unit} betragen"
-
-        if core and condition:
-            core = f"{core} ({condition})"
-
-        if res.get("sentence_de"):
-            sentence = res["sentence_de"]
-        elif core:
-            sentence = f"Laut {law}" + (f" (Abschnitt {section})" if section else "") + f": {core}."
+def load_result(result_id):
+    """Meta + "rows" list, or None."""
+    meta = load_result_meta(result_id)
+    if meta is None:
+        return None
+    with metrics.span("result_load"):
+        meta["rows"] = list(iter_result_rows(result_id))
+    return meta
+
+# ?sort= of the rows API -> column; "value:<attribute>" sorts by a value (empty ones last)
+RESULT_SORT_COLUMNS = {"idx": "idx", "short": "short", "ifctype": "ifctype", "globalid": "global_id",
+                       "name": "name", "status": "status", "file": "file"}
+RESULT_STATUSES = ("ok", "fail", "missing")
+
+def query_result_rows(result_id, page=1, per_page=None, sort="short", order="asc",
+                      short=(), ifctype=(), attr=(), status=(), file=()):
+    """
+    One page of a stored result, filtered and sorted in SQL: (total matching, rows).
+    Each filter is a list of accepted values (empty = no filter); attr keeps rows
+    that have a value for any of the attributes. Rows carry "idx" and "status".
+    Raises ValueError for an unknown sort key, order or status.
+    """
+    per_page = per_page or RESULTS_PAGE_SIZE
+    if order not in ("asc", "desc"):
+        raise ValueError(f"order: asc oder desc, nicht {order!r}")
+    if any(s not in RESULT_STATUSES for s in status):
+        raise ValueError(f"status: {', '.join(RESULT_STATUSES)}")
+    params = [result_id]
+    where = ["result_id = ?"]
+    for column, values in (("short", short), ("ifctype", ifctype), ("status", status), ("file", file)):
+        if values:
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params += values
+    if attr:
+        where.append("(" + " OR ".join("instr(attrs, ?) > 0" for _ in attr) + ")")
+        params += [f"|{a}|" for a in attr]
+    if sort.startswith("value:"):
+        order_by = [f"json_extract(vals, ?) IS NULL, json_extract(vals, ?) {order}"]
+        path = "$." + json.dumps(sort[6:], ensure_ascii=False)
+        sort_params = [path, path]
+    elif sort in RESULT_SORT_COLUMNS:
+        order_by, sort_params = [f"{RESULT_SORT_COLUMNS[sort]} {order}"], []
+    else:
+        raise ValueError(f"sort: {', '.join(RESULT_SORT_COLUMNS)} oder value:<Attribut>")
+    if sort != "idx":
+        order_by.append(f"idx {order}")
+    sql_where = " AND ".join(where)
+    with closing(_results_db()) as db:
+        total = db.execute(f"SELECT COUNT(*) FROM result_rows WHERE {sql_where}", params).fetchone()[0]
+        recs = db.execute(f"SELECT * FROM result_rows WHERE {sql_where} ORDER BY {', '.join(order_by)} "
+                          "LIMIT ? OFFSET ?", params + sort_params + [per_page, (page - 1) * per_page]).fetchall()
+    rows = []
+    for rec in recs:
+        row = _row_from_record(rec)
+        row["idx"], row["status"] = rec["idx"], rec["status"]
+        rows.append(row)
+    return total, rows
+
+def result_facets(result_id):
+    """Row counts per Short, IfcType, status and file of a stored result (for filter menus)."""
+    facets = {}
+    with closing(_results_db()) as db:
+        for key, column in (("Short", "short"), ("IfcType", "ifctype"), ("status", "status"), ("File", "file")):
+            facets[key] = {r[0]: r[1] for r in db.execute(
+                f"SELECT {column}, COUNT(*) FROM result_rows WHERE result_id = ? AND {column} IS NOT NULL "
+                f"GROUP BY {column} ORDER BY {column}", (result_id,))}
+    return facets
+
+def recheck_result(result_id, standards=None, version=None):
+    """
+    Evaluate the stored rows of a result against the current standards again.
+    The extracted values don't depend on the standards, so no IFC is parsed;
+    only rows whose checks changed are rewritten. Returns the number of changed
+    rows (0 if already current), or None for an unknown result.
+    """
+    if standards is None:
+        standards, version = standards_snapshot()
+    rules = get_compiled_rules(standards, version)
+    with closing(_results_db()) as db:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            meta = db.execute("SELECT standards_version, files, diff FROM results WHERE id = ?", (result_id,)).fetchone()
+            if meta is None or meta["standards_version"] == version:
+                db.execute("ROLLBACK")
+                return None if meta is None else 0
+            recs = db.execute("SELECT * FROM result_rows WHERE result_id = ? ORDER BY idx", (result_id,)).fetchall()
+            rows = check_rows([_row_from_record(rec) for rec in recs], standards, rules)
+            updates = []
+            for rec, r in zip(recs, rows):
+                checks = json.dumps(r["checks"], ensure_ascii=False)
+                if checks != rec["checks"]:
+                    updates.append((_row_status(r), checks, result_id, rec["idx"]))
+            db.executemany("UPDATE result_rows SET status = ?, checks = ? WHERE result_id = ? AND idx = ?", updates)
+            db.execute("DELETE FROM report_keys WHERE result_id = ?", (result_id,))
+            files = json.loads(meta["files"]) if meta["files"] else None
+            for entry in files or []:
+                if not entry.get("error"):
+                    entry["total"], entry["ok"], entry["fail"], entry["missing"] = \
+                        _collect_summary([r for r in rows if r.get("File") == entry["filename"]])
+            diff = json.loads(meta["diff"]) if meta["diff"] else None
+            if diff:
+                status = {r["GlobalId"]: _row_status(r) for r in rows}
+                for entry in diff["elements"]:
+                    if entry["change"] != "removed":
+                        entry["after"] = status.get(entry["GlobalId"], entry["after"])
+            db.execute("UPDATE results SET standards = ?, standards_version = ?, files = ?, diff = ? WHERE id = ?",
+                       (json.dumps(standards, ensure_ascii=False), version,
+                        json.dumps(files, ensure_ascii=False) if files else None,
+                        json.dumps(diff, ensure_ascii=False) if diff else None, result_id))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+    return len(updates)
+
+def recheck_recent_results(hours=None):
+    """recheck_result for every result used within the last hours; returns how many were updated."""
+    hours = RECHECK_RECENT_HOURS if hours is None else hours
+    standards, version = standards_snapshot()
+    with closing(_results_db()) as db:
+        ids = [r["id"] for r in db.execute(
+            "SELECT id FROM results WHERE accessed >= ? AND (standards_version IS NULL OR standards_version != ?)",
+            (time.time() - hours * 3600, version))]
+    updated = 0
+    for result_id in ids:
+        try:
+            if recheck_result(result_id, standards, version) is not None:
+                updated += 1
+        except sqlite3.Error:
+            continue  # e.g. deleted meanwhile; the next change tries again
+    return updated
+
+def stored_report_key(result_id, mode, standards_version):
+    """report_cache_key remembered for a result, so a revalidation doesn't read its rows (None if unknown)."""
+    if standards_version is None:
+        return None
+    with closing(_results_db()) as db:
+        rec = db.execute("SELECT key FROM report_keys WHERE result_id = ? AND mode = ? AND standards_version = ? "
+                         "AND template_version = ?",
+                         (result_id, mode, standards_version, REPORT_TEMPLATE_VERSION)).fetchone()
+    return rec["key"] if rec else None
+
+def store_report_key(result_id, mode, standards_version, key):
+    if standards_version is None:
+        return
+    try:
+        with closing(_results_db()) as db:
+            db.execute("INSERT OR REPLACE INTO report_keys VALUES (?, ?, ?, ?, ?)",
+                       (result_id, mode, standards_version, REPORT_TEMPLATE_VERSION, key))
+    except sqlite3.IntegrityError:
+        pass  # the result expired in between
+
+def _report_payload(result):
+    """What _generate_results_pdf_report needs from a stored result."""
+    standards = result["standards"] or {}
+    return {
+        "rows": result["rows"],
+        "standards": standards,
+        "_ops": standards.get('_ops', {}) or {},
+        "_ranges": standards.get('_ranges', {}) or {},
+        "files": result.get("files"),
+    }
+
+# -----------------------------
+# Export (CSV / NDJSON / XLSX), streamed from the result store
+# -----------------------------
+EXPORT_FORMATS = {
+    "csv":    ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "xlsx":   ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+def _export_tables(meta, layout="elements"):
+    """
+    (header, row iterator) for a stored result. "elements": one line per element with
+    value and check per column of compute_table_columns; "checks": the report's detail table.
+    """
+    rows = iter_result_rows(meta["id"])
+    if layout == "checks":
+        standards = meta["standards"] or {}
+        lines = _iter_detailed_table_rows(rows, standards, standards.get('_ops', {}) or {},
+                                          standards.get('_ranges', {}) or {}, short_gid=False)
+        return DETAIL_TABLE_HEADER, lines
+    return element_table(rows, meta["columns"] or [], with_file=bool(meta.get("files")))
+
+def _iter_csv(header, lines, batch=500):
+    buf = StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")  # BOM, so Excel picks UTF-8 for the umlauts
+    writer.writerow(header)
+    for i, line in enumerate(lines, 1):
+        writer.writerow(["" if v is None else v for v in line])
+        if i % batch == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0); buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+def _iter_ndjson(meta, batch=500):
+    out = []
+    for i, r in enumerate(iter_result_rows(meta["id"]), 1):
+        r["Status"] = _row_status(r)
+        out.append(json.dumps(r, ensure_ascii=False))
+        if i % batch == 0:
+            yield ("\n".join(out) + "\n").encode("utf-8")
+            out = []
+    if out:
+        yield ("\n".join(out) + "\n").encode("utf-8")
+
+class _ChunkSink:
+    """Write-only file object that zipfile can stream into; collects bytes until drained."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _xlsx_col(i):
+    name = ""
+    i += 1
+    while i:
+        i, rem = divmod(i - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+def _xlsx_row(n, values):
+    cells = []
+    for i, v in enumerate(values):
+        if v is None or v == "":
+            continue
+        ref = f"{_xlsx_col(i)}{n}"
+        if isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v):
+            cells.append(f'<c r="{ref}"><v>{v!r}</v></c>')
         else:
-            sentence = f"Laut {law}" + (f" (Abschnitt {section})" if section else "") + " liegt eine relevante Vorgabe vor."
+            text = xml_escape(_XML_ILLEGAL.sub("", str(v)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{n}">{"".join(cells)}</row>'
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Prüfergebnisse" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+
+def _iter_xlsx(header, lines, batch=500):
+    """
+    Minimal single-sheet workbook (inline strings, no styles), written with zipfile
+    into a sink that is drained after every batch, so it never sits in memory whole.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_STATIC.items():
+            zf.writestr(name, xml)
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetViews><sheetView workbookViewId="0">'
+                         '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                         '</sheetView></sheetViews><sheetData>' + _xlsx_row(1, header)).encode("utf-8"))
+            part = []
+            for n, line in enumerate(lines, 2):
+                part.append(_xlsx_row(n, line))
+                if len(part) >= batch:
+                    sheet.write("".join(part).encode("utf-8"))
+                    part = []
+                    yield sink.drain()
+            sheet.write(("".join(part) + "</sheetData></worksheet>").encode("utf-8"))
+    yield sink.drain()
+
+def export_result(meta, fmt, layout="elements"):
+    """Byte chunks of a stored result in one of EXPORT_FORMATS."""
+    if fmt == "ndjson":
+        return _iter_ndjson(meta)
+    header, lines = _export_tables(meta, layout)
+    return _iter_csv(header, lines) if fmt == "csv" else _iter_xlsx(header, lines)
 
-        out[attr] = {
-            "summary": sentence,
-            "evidence": res.get("quote") or res.get("evidence"),
-            "confidence": res.get("confidence"),
-        }
+# -----------------------------
+# Background jobs (SQLite queue + local worker threads)
+# -----------------------------
+def _jobs_db():
+    conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id       TEXT PRIMARY KEY,
+            status   TEXT NOT NULL,          -- queued | running | done | error
+            filename TEXT,
+            filepath TEXT NOT NULL,
+            digest   TEXT,
+            created  REAL NOT NULL,
+            started  REAL,
+            finished REAL,
+            owner    TEXT,                   -- host:pid of the worker running it
+            error    TEXT,
+            result   TEXT,                   -- JSON {"result_id": ...}
+            files    TEXT,                   -- batch jobs: JSON [{filename, filepath, digest}]
+            baseline TEXT                    -- revision jobs: result id to diff against
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+    _add_missing_columns(conn, "jobs", {"files": "TEXT", "baseline": "TEXT"})
+    return conn
+
+_job_owner = f"{socket.gethostname()}:{os.getpid()}"
+_job_wakeup = threading.Event()
+_job_workers = {"pid": None}
+_job_workers_lock = threading.Lock()
+
+def enqueue_job(filepath, filename, digest, files=None, baseline=None):
+    """
+    Queue a check of one stored IFC file, of several (files) as one batch job,
+    or of a revision diffed against a stored result (baseline).
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with closing(_jobs_db()) as db:
+        db.execute("INSERT INTO jobs (id, status, filename, filepath, digest, created, files, baseline) "
+                   "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                   (job_id, filename, filepath, digest, now,
+                    json.dumps(files, ensure_ascii=False) if files else None, baseline))
+        db.execute("DELETE FROM jobs WHERE status IN ('done', 'error') AND finished < ?",
+                   (now - JOB_RETENTION_HOURS * 3600,))
+    _job_wakeup.set()
+    return job_id
+
+def get_job(job_id):
+    with closing(_jobs_db()) as db:
+        row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        if job["status"] == "queued":
+            job["position"] = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?",
+                                         (job["created"],)).fetchone()[0]
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["files"] = json.loads(job["files"]) if job["files"] else None
+    return job
+
+def _job_public(job):
+    """Status fields safe to hand to the browser."""
+    return {k: job.get(k) for k in ("id", "status", "filename", "created", "started", "finished", "error", "position")}
+
+def _claim_job():
+    with closing(_jobs_db()) as db:
+        db.execute("BEGIN IMMEDIATE")
+        row = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+        if row:
+            db.execute("UPDATE jobs SET status = 'running', owner = ?, started = ? WHERE id = ?",
+                       (_job_owner, time.time(), row["id"]))
+        db.execute("COMMIT")
+    return dict(row) if row else None
+
+def _finish_job(job_id, result=None, error=None, attempts=3):
+    """Record the outcome; retried, since a job left 'running' by a live worker is never requeued."""
+    for attempt in range(attempts):
+        try:
+            with closing(_jobs_db()) as db:
+                db.execute("UPDATE jobs SET status = ?, finished = ?, error = ?, result = ? WHERE id = ?",
+                           ("error" if error else "done", time.time(), error,
+                            json.dumps(result, ensure_ascii=False) if result is not None else None, job_id))
+            return
+        except sqlite3.OperationalError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(JOB_WORKER_BACKOFF_SECONDS)
+
+def _owner_alive(owner):
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # another machine's worker; leave it to its own recovery
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _requeue_orphaned_jobs():
+    """Jobs left 'running' by a recycled or crashed worker go back to the queue."""
+    with closing(_jobs_db()) as db:
+        running = db.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+        for row in running:
+            if row["owner"] != _job_owner and not _owner_alive(row["owner"]):
+                db.execute("UPDATE jobs SET status = 'queued', owner = NULL, started = NULL "
+                           "WHERE id = ? AND status = 'running'", (row["id"],))
+
+def _release_own_jobs():
+    """On a graceful exit (e.g. --max-requests recycling) hand running jobs back."""
+    try:
+        with closing(_jobs_db()) as db:
+            db.execute("UPDATE jobs SET status = 'queued', owner = NULL, started = NULL "
+                       "WHERE status = 'running' AND owner = ?", (_job_owner,))
+    except sqlite3.Error:
+        pass
 
-    return out
+def _run_next_job():
+    """Claim and run one queued job; False if the queue is empty."""
+    job = _claim_job()
+    if not job:
+        return False
+    kind = "batch" if job["files"] else "revision" if job["baseline"] else "single"
+    metrics.observe("stage_seconds", time.time() - job["created"], stage="queue_wait")
+    try:
+        with metrics.span("job", kind=kind):
+            if job["files"]:
+                result = run_batch_pipeline(json.loads(job["files"]))
+            elif job["baseline"]:
+                result = run_revision_pipeline(job["filepath"], job["digest"], job["baseline"])
+            else:
+                result = run_check_pipeline(job["filepath"], job["digest"])
+            with metrics.span("save_result"):
+                result_id = save_result(result, filename=job["filename"], digest=job["digest"])
+    except Exception as e:
+        _finish_job(job["id"], error=str(e))
+    else:
+        _finish_job(job["id"], result={"result_id": result_id})
+    return True
+
+def _job_worker_loop():
+    while True:
+        try:
+            if not _run_next_job():
+                # idle workers still hand in what requests recorded, so no worker lags behind /metrics
+                metrics.flush_if_due(METRICS_DB, METRICS_FLUSH_SECONDS)
+                _job_wakeup.wait(timeout=2)
+                _job_wakeup.clear()
+                continue
+            metrics.flush_if_due(METRICS_DB, METRICS_FLUSH_SECONDS)
+        except Exception:
+            # e.g. "database is locked" or a full disk; the thread must survive it
+            app.logger.exception("Job worker error, retrying in %s s", JOB_WORKER_BACKOFF_SECONDS)
+            time.sleep(JOB_WORKER_BACKOFF_SECONDS)
+
+def start_job_workers():
+    """
+    Start JOB_WORKERS threads once per process. gunicorn calls this right after
+    forking a worker (see gunicorn.conf.py), so jobs queued before a restart
+    don't wait for the first request; other servers start them on the first request.
+    """
+    global _job_owner
+    with _job_workers_lock:
+        if _job_workers["pid"] == os.getpid():
+            return
+        _job_owner = f"{socket.gethostname()}:{os.getpid()}"
+        _job_workers["pid"] = os.getpid()
+        os.makedirs(os.path.dirname(JOBS_DB) or ".", exist_ok=True)
+        _requeue_orphaned_jobs()
+        atexit.register(_release_own_jobs)
+        atexit.register(metrics.flush, METRICS_DB)  # recycled workers keep their last numbers
+        for i in range(max(1, JOB_WORKERS)):
+            threading.Thread(target=_job_worker_loop, name=f"check-worker-{i}", daemon=True).start()
+
+@app.before_request  # fallback for servers without the post_fork hook (e.g. app.run)
+def _ensure_job_workers():
+    start_job_workers()
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_time(response):
+    started = g.get("request_started")
+    if started is not None:
+        metrics.observe("request_seconds", time.perf_counter() - started, endpoint=request.endpoint or "unknown")
+    metrics.flush_if_due(METRICS_DB, METRICS_FLUSH_SECONDS)
+    return response
 
 # -----------------------------
 # Routes
 # -----------------------------
 @app.route('/')
 def index():
-    return render_template('index.html', results=None, columns=[])
+    return render_template('index.html', columns=[])
 
 @app.route('/upload', methods=['POST'])
 def upload_ifc():
+    """
+    Store the upload and queue a check job; the job page polls until it is done.
+    With a "baseline" result id the upload is checked as a revision of that result.
+    """
+    wants_json = request.accept_mimetypes.best == "application/json"
     if 'file' not in request.files or request.files['file'].filename == '':
+        if wants_json:
+            return jsonify(error="Keine Datei ausgewählt."), 400
         flash('Keine Datei ausgewählt.')
         return redirect(url_for('index'))
 
     file = request.files['file']
     if not (file and allowed_file(file.filename, ALLOWED_IFC_EXTENSIONS)):
+        if wants_json:
+            return jsonify(error="Nur .ifc Dateien sind erlaubt."), 400
         flash('Nur .ifc Dateien sind erlaubt.')
         return redirect(url_for('index'))
 
+    baseline = request.form.get('baseline') or None
+    baseline_meta = load_result_meta(baseline) if baseline else None
+    if baseline and baseline_meta is None:
+        if wants_json:
+            return jsonify(error="Vergleichsergebnis nicht gefunden."), 400
+        flash('Vergleichsergebnis ist abgelaufen. Bitte die Datei ohne Vergleich hochladen.')
+        return redirect(url_for('index'))
+    if baseline_meta and baseline_meta["files"]:
+        # GlobalIds are only unique within one model, so a batch can't be diffed against a single file
+        if wants_json:
+            return jsonify(error="Ein Stapelergebnis kann nicht als Vergleich dienen."), 400
+        flash('Ein Stapelergebnis kann nicht als Vergleich dienen.')
+        return redirect(url_for('result_page', result_id=baseline))
+
     filename = secure_filename(file.filename)
-    filepath = os.path.join(app.config['UPLOAD_IFC_FOLDER'], filename)
-    os.makedirs(app.config['UPLOAD_IFC_FOLDER'], exist_ok=True)
-    file.save(filepath)
+    with metrics.span("upload_save"):
+        filepath, digest = store_ifc_upload(file)
+
+    job_id = enqueue_job(filepath, filename, digest, baseline=baseline)
+    _evict_ifc_store_after_upload()
+    if wants_json:
+        return jsonify(job_id=job_id, status="queued",
+                       status_url=url_for('job_status', job_id=job_id),
+                       result_url=url_for('job_result', job_id=job_id)), 202
+    return redirect(url_for('job_page', job_id=job_id))
+
+def _batch_members(uploads):
+    """
+    Store every .ifc of a batch upload (plain files and the .ifc members of zip
+    archives); returns [{filename, filepath, digest}]. Raises ValueError before
+    storing a file beyond BATCH_MAX_FILES.
+    """
+    members = []
+    unzipped = 0
+    for fs in uploads:
+        name = secure_filename(fs.filename)
+        if not name.lower().endswith(".zip"):
+            if len(members) >= BATCH_MAX_FILES:
+                raise ValueError(f'Höchstens {BATCH_MAX_FILES} Dateien pro Stapel.')
+            path, digest = store_ifc_upload(fs)
+            members.append({"filename": name, "filepath": path, "digest": digest})
+            continue
+        try:
+            archive = zipfile.ZipFile(fs.stream)
+        except zipfile.BadZipFile:
+            raise ValueError(f"{name} ist kein gültiges ZIP-Archiv.")
+        with archive:
+            for info in archive.infolist():
+                base = os.path.basename(info.filename)
+                if info.is_dir() or base.startswith(".") or "__MACOSX" in info.filename \
+                        or not allowed_file(base, ALLOWED_IFC_EXTENSIONS):
+                    continue
+                unzipped += info.file_size
+                if unzipped > BATCH_MAX_UNZIPPED_MB * 1024 * 1024 or len(members) >= BATCH_MAX_FILES:
+                    raise ValueError("Das Archiv ist zu groß oder enthält zu viele Dateien.")
+                # already stored members stay for evict_ifc_store; they may be shared with other jobs
+                try:
+                    with archive.open(info) as member:
+                        path, digest = store_ifc_upload(member)
+                except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError) as e:
+                    # CRC/size mismatch, truncated data, encrypted member, unsupported compression
+                    raise ValueError(f"{name}: {info.filename} kann nicht entpackt werden ({e}).")
+                members.append({"filename": secure_filename(info.filename), "filepath": path, "digest": digest})
+    return members
+
+@app.route('/upload_batch', methods=['POST'])
+def upload_batch():
+    """Several .ifc files and/or zip archives checked together as one batch job."""
+    wants_json = request.accept_mimetypes.best == "application/json"
+    def _fail(msg):
+        if wants_json:
+            return jsonify(error=msg), 400
+        flash(msg)
+        return redirect(url_for('index'))
 
+    uploads = [f for f in request.files.getlist('files') if f and f.filename]
+    if not uploads:
+        return _fail('Keine Dateien ausgewählt.')
+    if not all(allowed_file(f.filename, ALLOWED_BATCH_EXTENSIONS) for f in uploads):
+        return _fail('Nur .ifc Dateien oder .zip Archive sind erlaubt.')
+    if sum(not f.filename.lower().endswith(".zip") for f in uploads) > BATCH_MAX_FILES:
+        return _fail(f'Höchstens {BATCH_MAX_FILES} Dateien pro Stapel.')
     try:
-        rows = extract_id_daten_filtered(filepath)
-        columns = compute_table_columns(rows)
-        standards = load_standards()
-        ops_map = standards.get('_ops', {}) or {}
-        ranges_map = standards.get('_ranges', {}) or {}
-
-        def approx_eq(v, target, tol=0.01):
-            return abs(v - target) <= tol
-
-        def check_value(attr_label: str, value: float) -> bool | None:
-            """
-            Uses saved operator + stored values/ranges to evaluate a single attribute.
-            Returns True/False or None if insufficient data.
-            """
-            if value is None:
-                return None
-
-            op = (ops_map.get(attr_label) or "").strip()
-            # Bahnsteighöhe uses dedicated min/max keys
-            if attr_label == "Bahnsteighöhe (m)":
-                if op == "range":
-                    mn = standards.get("Bahnsteighöhe min (m)")
-                    mx = standards.get("Bahnsteighöhe max (m)")
-                    if mn is None and mx is None: return None
-                    ok = True
-                    if mn is not None: ok = ok and (value >= mn)
-                    if mx is not None: ok = ok and (value <= mx)
-                    return ok
-                # fallback to flat compare if someone set >=/<= or ≈ on Bahnsteighöhe
-                target = standards.get("Bahnsteighöhe min (m)")  # use min as anchor
-                if target is None: return None
-                if op == ">=": return value >= target
-                if op == "<=": return value <= target
-                if op == "≈":  return approx_eq(value, target, tol=0.01)
-                # default: no rule
-                return None
-
-            # Non-Bahnsteig attributes
-            if op == "range":
-                rng = ranges_map.get(attr_label) or {}
-                mn, mx = rng.get("min"), rng.get("max")
-                if mn is None and mx is None: return None
-                ok = True
-                if mn is not None: ok = ok and (value >= mn)
-                if mx is not None: ok = ok and (value <= mx)
-                return ok
-
-            if op == "≈":
-                target = standards.get(attr_label)
-                if target is None: return None
-                # small default tol; tweak per-unit if you want
-                tol = 0.001 if attr_label.endswith("(m)") else 0.1
-                return approx_eq(value, target, tol=tol)
-
-            if op in (">=", "<="):
-                target = standards.get(attr_label)
-                if target is None: return None
-                return (value >= target) if op == ">=" else (value <= target)
-
-            # No operator saved -> keep legacy defaults (>= for Breite/Länge/Abstand, <= for Neigung/Längsneigung, ≈ for Spurbreite)
-            target = standards.get(attr_label)
-            if target is None:
-                # Bahnsteighöhe legacy handled above via min/max
-                return None
-            if attr_label in ("Breite (m)", "Länge (m)", "Abstand Gleismitte (m)"):
-                return value >= target
-            if attr_label in ("Neigung (%)", "Längsneigung (%)"):
-                return value <= target
-            if attr_label == "Spurbreite (m)":
-                return approx_eq(value, target, tol=0.001)
-            return None
-        
-        for r in rows:
-            checks = {}
-            vals = r["Values"]
-            short = (r["Short"] or "").lower()
-
-            if short == "rampe":
-                if vals.get("Breite (m)") is not None:
-                    checks["Breite (m)"] = check_value("Breite (m)", vals["Breite (m)"])
-                if vals.get("Länge (m)") is not None:
-                    checks["Länge (m)"] = check_value("Länge (m)", vals["Länge (m)"])
-                if vals.get("Neigung (%)") is not None:
-                    checks["Neigung (%)"] = check_value("Neigung (%)", vals["Neigung (%)"])
-
-            elif short == "bahnsteig":
-                if vals.get("Bahnsteighöhe (m)") is not None:
-                    checks["Bahnsteighöhe (m)"] = check_value("Bahnsteighöhe (m)", vals["Bahnsteighöhe (m)"])
-
-            elif short == "schiene":
-                if vals.get("Längsneigung (%)") is not None:
-                    checks["Längsneigung (%)"] = check_value("Längsneigung (%)", vals["Längsneigung (%)"])
-
-            elif short == "schwelle":
-                if vals.get("Spurbreite (m)") is not None:
-                    checks["Spurbreite (m)"] = check_value("Spurbreite (m)", vals["Spurbreite (m)"])
-
-            elif short == "mast":
-                if vals.get("Abstand Gleismitte (m)") is not None:
-                    checks["Abstand Gleismitte (m)"] = check_value("Abstand Gleismitte (m)", vals["Abstand Gleismitte (m)"])
-
-            r["checks"] = checks
-
-        ai_sources = _ai_extract_for_results_local(rows, standards)
-        
-        # Stash everything needed for the PDF report
-        session["report_payload"] = {
-        "rows": rows,
-        "standards": standards,
-        "_ops": ops_map,
-        "_ranges": ranges_map,
-        }
+        with metrics.span("upload_save", kind="batch"):
+            members = _batch_members(uploads)
+    except ValueError as e:
+        return _fail(str(e))
+    if not members:
+        return _fail('Keine .ifc Dateien gefunden.')
+
+    label = members[0]["filename"] if len(members) == 1 else f"{len(members)} Dateien"
+    job_id = enqueue_job("", label, None, files=members)
+    _evict_ifc_store_after_upload()
+    if wants_json:
+        return jsonify(job_id=job_id, status="queued", files=[m["filename"] for m in members],
+                       status_url=url_for('job_status', job_id=job_id),
+                       result_url=url_for('job_result', job_id=job_id)), 202
+    return redirect(url_for('job_page', job_id=job_id))
+
+@app.route('/jobs/<job_id>')
+def job_page(job_id):
+    job = get_job(job_id)
+    if not job:
+        flash('Prüfauftrag nicht gefunden.')
+        return redirect(url_for('index'))
 
+    if job["status"] == "error":
+        flash(f"Fehler beim Lesen der IFC-Datei: {job['error']}")
+        return redirect(url_for('index'))
+
+    if job["status"] != "done":
+        return render_template('index.html', columns=[], job=_job_public(job))
+
+    return _render_result(job["result"]["result_id"])
+
+def _render_result(result_id):
+    """The results page; its rows are fetched page by page from /api/results/<id>/rows."""
+    result = load_result_meta(result_id)
+    if result is None:
+        flash('Prüfergebnis ist abgelaufen. Bitte die Datei erneut hochladen.')
+        return redirect(url_for('index'))
+    # fallback for /download_report and /export/<fmt> without a result id
+    session["result_id"] = result_id
+
+    # the database reads stay outside the "render" span, which times the template only
+    facets = result_facets(result_id)
+    outdated = result["standards_version"] != standards_snapshot()[1]
+    with metrics.span("render"):
         return render_template(
             'index.html',
-            results=rows,
-            columns=columns,
-            standards=standards,
-            ai_sources=ai_sources
+            row_count=result["row_count"],
+            facets=facets,
+            columns=result["columns"],
+            standards=result["standards"],
+            ai_sources=result["ai_sources"],
+            files=result["files"],
+            diff=result["diff"],
+            result_id=result_id,
+            outdated=outdated
         )
 
-    except Exception as e:
-        flash(f"Fehler beim Lesen der IFC-Datei: {str(e)}")
+@app.route('/results/<result_id>')
+def result_page(result_id):
+    return _render_result(result_id)
+
+@app.route('/results/<result_id>/recheck', methods=['POST'])
+def recheck(result_id):
+    """Apply the current standards to a stored result without parsing the IFC again."""
+    wants_json = request.accept_mimetypes.best == "application/json"
+    changed = recheck_result(result_id)
+    if changed is None:
+        if wants_json:
+            return jsonify(error="not found"), 404
+        flash('Prüfergebnis ist abgelaufen. Bitte die Datei erneut hochladen.')
         return redirect(url_for('index'))
+    if wants_json:
+        return jsonify(result_id=result_id, changed_rows=changed, standards_version=standards_snapshot()[1])
+    flash(f"Mit den aktuellen Grenzwerten neu geprüft ({changed} Elemente geändert).", "success")
+    return redirect(url_for('result_page', result_id=result_id))
+
+@app.route('/api/results/<result_id>')
+def api_result(result_id):
+    """A stored result without its rows, plus the counts for the filter menus."""
+    meta = load_result_meta(result_id)
+    if meta is None:
+        return jsonify(error="not found"), 404
+    meta["facets"] = result_facets(result_id)
+    meta["outdated"] = meta["standards_version"] != standards_snapshot()[1]
+    meta["rows_url"] = url_for('api_result_rows', result_id=result_id)
+    return jsonify(meta)
+
+@app.route('/api/results/<result_id>/rows')
+def api_result_rows(result_id):
+    """
+    One page of a stored result: ?page, ?per_page, ?sort (see RESULT_SORT_COLUMNS
+    or value:<Attribut>), ?order=asc|desc and the repeatable filters ?short,
+    ?ifctype, ?attr, ?status (ok|fail|missing) and ?file.
+    """
+    args = request.args
+    try:
+        page = max(1, int(args.get("page", 1)))
+        per_page = min(RESULTS_PAGE_MAX, max(1, int(args.get("per_page", RESULTS_PAGE_SIZE))))
+    except ValueError:
+        return jsonify(error="page und per_page müssen ganze Zahlen sein."), 400
+    try:
+        total, rows = query_result_rows(
+            result_id, page, per_page, args.get("sort", "short"), args.get("order", "asc"),
+            short=args.getlist("short"), ifctype=args.getlist("ifctype"), attr=args.getlist("attr"),
+            status=args.getlist("status"), file=args.getlist("file"))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if not total and load_result_meta(result_id) is None:
+        return jsonify(error="not found"), 404
+    return jsonify(result_id=result_id, page=page, per_page=per_page, total=total,
+                   pages=(total + per_page - 1) // per_page, rows=rows)
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Stage/request latency histograms and cache counters of all workers (Prometheus format)."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return abort(401)
+    return Response(metrics.render(METRICS_DB), mimetype="text/plain; version=0.0.4")
+
+@app.route('/jobs/<job_id>/status')
+def job_status(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify(error="not found"), 404
+    return jsonify(_job_public(job))
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify(error="not found"), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify(_job_public(job)), 202
+    if job["status"] == "error":
+        return jsonify(_job_public(job)), 500
+    result = load_result(job["result"]["result_id"])
+    if result is None:
+        return jsonify(error="expired"), 410
+    return jsonify(result)
 
 @app.route('/admin', methods=["GET", "POST"])
 def admin_upload():
@@ -873,12 +1838,20 @@ def admin_upload():
 
     if session.get("admin"):
         current_standards = load_standards()
-        return render_template("admin.html", standards=current_standards)
+        return render_template("admin.html", standards=current_standards, ai_cache=ai_cache_stats())
     else:
         return redirect(url_for("index"))
 
 @app.route('/upload_standard', methods=['POST'])
 def upload_standard():
+    # hold the lock from load to save so concurrent edits can't overwrite each other
+    with standards_lock():
+        response = _apply_standard_form()
+    if RECHECK_RECENT_HOURS:
+        threading.Thread(target=recheck_recent_results, name="recheck", daemon=True).start()
+    return response
+
+def _apply_standard_form():
     """
     Reads the fields:
       comp_<Obj>_<AttrKey>, val_<Obj>_<AttrKey>, min_<Obj>_<AttrKey>, max_<Obj>_<AttrKey>
@@ -1025,18 +1998,81 @@ def upload_standard():
     flash("Standards & Quellen gespeichert.", "success")
     return redirect(url_for('admin_upload'))
 
+@app.route('/admin/clear_ai_cache', methods=['POST'])
+def admin_clear_ai_cache():
+    if not session.get("admin"):
+        return redirect(url_for("index"))
+    removed = clear_ai_cache()
+    flash(f"KI-Zwischenspeicher geleert ({removed} Einträge).", "success")
+    return redirect(url_for('admin_upload'))
+
+@app.route('/admin/recheck_results', methods=['POST'])
+def admin_recheck_results():
+    if not session.get("admin"):
+        return redirect(url_for("index"))
+    started = time.perf_counter()
+    updated = recheck_recent_results(RESULT_TTL_HOURS)
+    flash(f"{updated} gespeicherte Prüfergebnisse neu geprüft ({time.perf_counter() - started:.1f} s).", "success")
+    return redirect(url_for('admin_upload'))
+
 @app.route("/download_report")
-def download_report():
-    payload = session.get("report_payload")
-    if not payload:
+@app.route("/results/<result_id>/report")
+def download_report(result_id=None):
+    # without an id in the URL: the result page opened last in this session
+    result_id = result_id or session.get("result_id")
+    meta = load_result_meta(result_id)
+    if not meta:
         return abort(400, description="No results available to export. Upload and check an IFC file first.")
-    pdf_buffer = _generate_results_pdf_report(payload)
-    return send_file(
-        pdf_buffer,
-        mimetype="application/pdf",
-        as_attachment=True,
-        download_name="ifc_check_results.pdf",
-    )
+    mode = request.args.get("mode", "full")
+    if mode not in REPORT_MODES:
+        return abort(400, description=f"Unknown report mode. Use one of: {', '.join(REPORT_MODES)}.")
+    # the key is known once the report was requested, so revalidating doesn't read the rows
+    key = stored_report_key(result_id, mode, meta["standards_version"])
+    payload = None
+    if not key:
+        result = load_result(result_id)
+        if not result:
+            return abort(400, description="No results available to export. Upload and check an IFC file first.")
+        payload = _report_payload(result)
+        key = report_cache_key(payload, mode)
+        store_report_key(result_id, mode, result["standards_version"], key)
+    if request.if_none_match.contains(key):
+        rv = app.response_class(status=304)
+        rv.set_etag(key)
+        return rv
+    if payload is None:
+        result = load_result(result_id)
+        if not result:
+            return abort(400, description="No results available to export. Upload and check an IFC file first.")
+        payload = _report_payload(result)
+    download_name = "ifc_check_results.pdf" if mode == "full" else f"ifc_check_results_{mode}.pdf"
+    try:
+        pdf = cached_report_pdf(payload, mode, key=key)
+        rv = send_file(pdf, mimetype="application/pdf", as_attachment=True,
+                       download_name=download_name, etag=key, conditional=True)
+    except OSError:
+        # cache not writable, or the file was evicted in between: serve a fresh render
+        rv = send_file(_generate_results_pdf_report(payload, mode=mode), mimetype="application/pdf",
+                       as_attachment=True, download_name=download_name, etag=key, conditional=True)
+    rv.cache_control.private = True
+    return rv
+
+@app.route("/export/<fmt>")
+@app.route("/results/<result_id>/export/<fmt>")
+def export_results(fmt, result_id=None):
+    """Streamed export of a result (default: the session's); ?layout=checks gives one line per checked value."""
+    if fmt not in EXPORT_FORMATS:
+        return abort(404)
+    layout = request.args.get("layout", "elements")
+    if layout not in ("elements", "checks"):
+        return abort(400, description="Unknown layout. Use elements or checks.")
+    meta = load_result_meta(result_id or session.get("result_id"))
+    if not meta:
+        return abort(400, description="No results available to export. Upload and check an IFC file first.")
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    suffix = "_pruefungen" if layout == "checks" and fmt != "ndjson" else ""
+    return Response(export_result(meta, fmt, layout), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=ifc_check_results{suffix}.{ext}"})
 
 # Serve uploaded source PDFs safely
 @app.route("/sources/<path:filename>")
@@ -1045,6 +2081,10 @@ def get_source(filename):
 
 @app.route('/delete_source', methods=['POST'])
 def delete_source():
+    with standards_lock():
+        return _delete_source_locked()
+
+def _delete_source_locked():
     """
     Remove the stored source for an attribute.
     Accepts:
@@ -1091,4 +2131,8 @@ if __name__ == '__main__':
     os.makedirs(UPLOAD_IFC_FOLDER, exist_ok=True)
     os.makedirs(UPLOAD_SRC_FOLDER, exist_ok=True)
     os.makedirs(URL_CACHE_FOLDER, exist_ok=True)
+    os.makedirs(PDF_TEXT_CACHE_FOLDER, exist_ok=True)
+    os.makedirs(EXTRACT_CACHE_FOLDER, exist_ok=True)
+    os.makedirs(AI_CACHE_FOLDER, exist_ok=True)
+    os.makedirs(REPORT_CACHE_FOLDER, exist_ok=True)
     app.run(debug=True, use_reloader=True)
@@ -0,0 +1,144 @@
+"""
+Stage latency histograms and cache hit/miss counters in the Prometheus text format.
+
+Recording only touches an in-process buffer. flush() adds that buffer to a
+SQLite file shared by all gunicorn workers, so render() reports totals over
+every worker, including ones recycled since. Process-pool children hand their
+buffer back with their result (drain() there, merge() in the parent).
+"""
+import bisect
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+PREFIX = "ifc_checker_"
+# Upper bounds (seconds) of the latency buckets; +Inf is implicit
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# name -> (type, help)
+METRICS = {
+    "stage_seconds": ("histogram", "Duration of one processing stage."),
+    "request_seconds": ("histogram", "HTTP request latency by endpoint."),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result (hit or miss)."),
+}
+
+_lock = threading.Lock()
+_buffer = {}  # (name, labels) -> {field: value}; field is "le:<bound>", "sum", "count" or "" (counter)
+_last_flush = [time.monotonic()]
+
+def _labels(labels):
+    """Prometheus label string, e.g. stage="extract"."""
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{k}="{esc(v)}"' for k, v in sorted(labels.items()))
+
+def _add(key, fields):
+    with _lock:
+        entry = _buffer.setdefault(key, {})
+        for field, value in fields.items():
+            entry[field] = entry.get(field, 0) + value
+
+def observe(name, seconds, **labels):
+    """Add one observation to the histogram `name`."""
+    i = bisect.bisect_left(BUCKETS, seconds)
+    le = repr(BUCKETS[i]) if i < len(BUCKETS) else "+Inf"
+    _add((name, _labels(labels)), {f"le:{le}": 1, "sum": seconds, "count": 1})
+
+def inc(name, amount=1, **labels):
+    """Increase the counter `name`."""
+    _add((name, _labels(labels)), {"": amount})
+
+@contextmanager
+def span(stage, **labels):
+    """Time the block as stage_seconds{stage=...}, also when it raises."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_seconds", time.perf_counter() - t0, stage=stage, **labels)
+
+def cache(name, hit):
+    """Count one lookup of cache `name`."""
+    inc("cache_requests_total", cache=name, result="hit" if hit else "miss")
+
+def drain():
+    """Take (and clear) everything recorded in this process since the last drain/flush."""
+    global _buffer
+    with _lock:
+        out, _buffer = _buffer, {}
+    return out
+
+def merge(recorded):
+    """Add a drained buffer (e.g. from a pool child) to this process' buffer."""
+    for key, fields in (recorded or {}).items():
+        _add(key, fields)
+
+def _db(path):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS samples (
+            name   TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            field  TEXT NOT NULL,       -- le:<bound> | sum | count | "" (counter)
+            value  REAL NOT NULL,
+            PRIMARY KEY (name, labels, field)
+        ) WITHOUT ROWID""")
+    return conn
+
+def flush(path):
+    """Add this process' buffer to the shared totals in the SQLite file at path."""
+    _last_flush[0] = time.monotonic()
+    recorded = drain()
+    if not recorded:
+        return
+    try:
+        with closing(_db(path)) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT INTO samples (name, labels, field, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name, labels, field) DO UPDATE SET value = value + excluded.value",
+                ((name, labels, field, value)
+                 for (name, labels), fields in recorded.items() for field, value in fields.items()))
+            db.execute("COMMIT")
+    except sqlite3.Error:
+        merge(recorded)  # try again with the next flush
+
+def flush_if_due(path, interval):
+    """flush() at most every `interval` seconds."""
+    if time.monotonic() - _last_flush[0] >= interval:
+        flush(path)
+
+def _num(v):
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def _series(name, labels):
+    return f"{name}{{{labels}}}" if labels else name
+
+def render(path):
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    flush(path)
+    with closing(_db(path)) as db:
+        rows = db.execute("SELECT name, labels, field, value FROM samples ORDER BY name, labels").fetchall()
+    series = {}
+    for name, labels, field, value in rows:
+        series.setdefault(name, {}).setdefault(labels, {})[field] = value
+
+    out = []
+    for name, (kind, help_text) in METRICS.items():
+        full = PREFIX + name
+        out.append(f"# HELP {full} {help_text}")
+        out.append(f"# TYPE {full} {kind}")
+        for labels, fields in series.get(name, {}).items():
+            if kind == "counter":
+                out.append(f"{_series(full, labels)} {_num(fields.get('', 0))}")
+                continue
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound in BUCKETS:
+                cumulative += fields.get(f"le:{bound!r}", 0)
+                out.append(f'{full}_bucket{{{labels}{sep}le="{bound!r}"}} {_num(cumulative)}')
+            out.append(f'{full}_bucket{{{labels}{sep}le="+Inf"}} {_num(fields.get("count", 0))}')
+            out.append(f"{_series(full + '_sum', labels)} {_num(fields.get('sum', 0))}")
+            out.append(f"{_series(full + '_count', labels)} {_num(fields.get('count', 0))}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,408 @@
+"""
+PDF report of checked rows (ReportLab). No Flask here: the web app and cli.py
+both render through _generate_results_pdf_report.
+"""
+import os
+from io import BytesIO
+from functools import lru_cache
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Table, TableStyle, Flowable
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from checker import DETAIL_TABLE_HEADER, _collect_summary, _iter_detailed_table_rows
+
+STATIC_IMG_DIR = os.path.join(os.path.dirname(__file__), "static", "img")
+DB_LOGO_PATH   = os.path.join(STATIC_IMG_DIR, "db-infrago.png")
+UDE_LOGO_PATH  = os.path.join(STATIC_IMG_DIR, "ude-logo.png")
+
+# PDF report contents: every checked value, only failed checks, or counts per object type.
+REPORT_MODES = ("full", "failures", "summary")
+
+LEGAL_FOOTER = (
+    "DB InfraGO AG | Sitz: Frankfurt am Main | Registergericht: Frankfurt am Main HRB 50879 | "
+    "USt-IdNr.: DE 199861757 | Vorsitz des Aufsichtsrats: Berthold Huber | "
+    "Vorstand: Dr. Philipp Nagl (Vorsitz), Jens Bergmann, Dr. Christian Gruß, "
+    "Heike Junge-Latz, Klaus Müller, Heinz Siegmund, Ralf Thieme"
+)
+
+def _load_logo(path):
+    try:
+        if os.path.isfile(path):
+            return ImageReader(path)
+    except Exception:
+        pass
+    return None
+
+DB_LOGO_IMG  = _load_logo(DB_LOGO_PATH)
+UDE_LOGO_IMG = _load_logo(UDE_LOGO_PATH)
+
+def _wrap_to_width(text, max_width_pt, font="Helvetica", size=7):
+    """Greedy wrap into lines that fit max_width_pt with the given font/size."""
+    words = (text or "").split()
+    lines, cur = [], ""
+    for w in words:
+        cand = (cur + " " + w).strip()
+        if cur and stringWidth(cand, font, size) > max_width_pt:
+            lines.append(cur)
+            cur = w
+        else:
+            cur = cand
+    if cur:
+        lines.append(cur)
+    return lines
+
+@lru_cache(maxsize=4096)
+def _fit_ellipsis(text, max_width_pt, font_name="Helvetica", font_size=9, ellipsis="…"):
+    """
+    Return text that fits into max_width_pt (points) using the given font,
+    truncating with an ellipsis if needed. Memoized: a report has only a few
+    distinct IFC types but one cell per checked value.
+    """
+    if text is None:
+        return ""
+    text = str(text)
+    if stringWidth(text, font_name, font_size) <= max_width_pt:
+        return text
+    # Make sure even just the ellipsis fits
+    if stringWidth(ellipsis, font_name, font_size) > max_width_pt:
+        return ""  # nothing fits cleanly
+    # Binary search for the longest prefix that fits with ellipsis
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        candidate = text[:mid] + ellipsis
+        if stringWidth(candidate, font_name, font_size) <= max_width_pt:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + ellipsis
+
+class _ChunkedTable(Flowable):
+    """
+    A long table laid out one page at a time. Rows are pulled lazily from an
+    iterator and each split yields a page-sized Table (with the header repeated),
+    so ReportLab never measures or splits the whole table at once.
+    """
+    def __init__(self, header, rows, col_widths, style_cmds, row_backgrounds,
+                 prepare_row=None, buffered=None, metrics=None):
+        Flowable.__init__(self)
+        self._header = header
+        self._rows = iter(rows)
+        self._buf = list(buffered or [])
+        self._col_widths = col_widths
+        self._style_cmds = style_cmds
+        self._row_backgrounds = row_backgrounds
+        self._prepare_row = prepare_row or (lambda row: row)
+        self._metrics = metrics      # (header height, row height), measured once
+        self._exhausted = False
+        self._table = None
+
+    def _fill(self, n):
+        while len(self._buf) < n and not self._exhausted:
+            try:
+                self._buf.append(self._prepare_row(next(self._rows)))
+            except StopIteration:
+                self._exhausted = True
+
+    def _make_table(self, body):
+        # stripes restart on every page, as they did when ReportLab split one big Table
+        tbl = Table([self._header] + body, repeatRows=1, colWidths=self._col_widths)
+        tbl.setStyle(TableStyle(self._style_cmds + [("ROWBACKGROUNDS", (0,1), (-1,-1), self._row_backgrounds)]))
+        return tbl
+
+    def _measure(self, availWidth, availHeight):
+        if self._metrics is None:
+            self._fill(1)
+            sample = self._make_table(self._buf[:1] or [self._header])
+            sample.wrap(availWidth, availHeight)
+            self._metrics = (sample._rowHeights[0], sample._rowHeights[1])
+        return self._metrics
+
+    def _rows_fitting(self, availWidth, availHeight):
+        header_h, row_h = self._measure(availWidth, availHeight)
+        return max(0, int((availHeight - header_h) // row_h))
+
+    def wrap(self, availWidth, availHeight):
+        n = self._rows_fitting(availWidth, availHeight)
+        self._fill(n + 1)
+        if len(self._buf) > n:
+            # more rows than fit: report "too tall" so the frame asks us to split
+            return sum(self._col_widths), availHeight + self._metrics[1]
+        self._table = self._make_table(self._buf)
+        return self._table.wrap(availWidth, availHeight)
+
+    def split(self, availWidth, availHeight):
+        n = self._rows_fitting(availWidth, availHeight)
+        self._fill(n + 1)
+        take = self._buf[:n]
+        while take:
+            tbl = self._make_table(take)
+            if tbl.wrap(availWidth, availHeight)[1] <= availHeight:
+                break
+            take = take[:-1]  # a multi-line cell made the slice taller than estimated
+        if not take:
+            return []
+        rest = self._buf[len(take):]
+        if not rest and self._exhausted:
+            return [tbl]
+        return [tbl, _ChunkedTable(self._header, self._rows, self._col_widths, self._style_cmds,
+                                   self._row_backgrounds, self._prepare_row,
+                                   buffered=rest, metrics=self._metrics)]
+
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
+
+def _draw_page_number(canvas: Canvas, page_count):
+    """Footer "Seite X von Y", on its own line, right aligned."""
+    w, h = A4
+    canvas.setFont("Helvetica", 8)
+    canvas.setFillColorRGB(0.20, 0.20, 0.20)
+    y_total = page_count if page_count else ""
+    page_txt = f"Seite {canvas.getPageNumber()} von {y_total}".strip()
+    canvas.drawRightString(w - 15*mm, 9*mm, page_txt)
+
+class _NumberedCanvas(Canvas):
+    """
+    Canvas that holds back finished pages until save(), when the page total is
+    known, and then stamps "Seite X von Y" on each. Saves a second layout pass.
+    """
+    def __init__(self, *args, **kwargs):
+        Canvas.__init__(self, *args, **kwargs)
+        self._saved_page_states = []
+
+    def showPage(self):
+        self._saved_page_states.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        page_count = len(self._saved_page_states)
+        for state in self._saved_page_states:
+            self.__dict__.update(state)
+            _draw_page_number(self, page_count)
+            Canvas.showPage(self)
+        Canvas.save(self)
+
+def _make_header_footer():
+    def _header_footer(canvas: Canvas, doc):
+        canvas.saveState()
+        w, h = A4
+        # --- draw logos ---
+        # Left: DB InfraGO
+        if DB_LOGO_IMG:
+            # ~22mm wide, ~8mm high, keep aspect
+            canvas.drawImage(
+                DB_LOGO_IMG,
+                15*mm,               # x
+                h - 14*mm,           # y (top area)
+                width=22*mm,
+                height=8*mm,
+                preserveAspectRatio=True,
+                mask='auto'
+            )
+
+        # Right: UDE logo
+        if UDE_LOGO_IMG:
+            # ~28mm wide, ~8mm high, keep aspect
+            canvas.drawImage(
+                UDE_LOGO_IMG,
+                w - 15*mm - 28*mm,   # x (flush right with 15mm margin)
+                h - 14*mm,           # y
+                width=28*mm,
+                height=8*mm,
+                preserveAspectRatio=True,
+                mask='auto'
+            )
+        # top rule
+        canvas.setStrokeColorRGB(0.90, 0.90, 0.92)
+        canvas.setLineWidth(0.6)
+        canvas.line(15*mm, h-15*mm, w-15*mm, h-15*mm)
+        # repeating small title
+        canvas.setFont("Helvetica", 9)
+        canvas.setFillColorRGB(0.10, 0.10, 0.10)
+        canvas.drawString(15*mm, h-19*mm, "Prüfbericht: Automatisierte fachliche Prüfung (IFC-BIM)")
+        # --- footer: line, wrapped legal, page X of Y on its own line ---
+        canvas.setStrokeColorRGB(0.90, 0.90, 0.92)
+        canvas.line(15*mm, 18*mm, w-15*mm, 18*mm)  # move line up for breathing room
+
+        legal_font = "Helvetica"
+        legal_size = 6.8
+        canvas.setFont(legal_font, legal_size)
+        canvas.setFillColorRGB(0.30, 0.30, 0.30)
+
+        left_x   = 15*mm
+        right_x  = w - 15*mm
+        max_legal_width = right_x - left_x
+
+        legal_lines = _wrap_to_width(LEGAL_FOOTER, max_legal_width, legal_font, legal_size)[:2]
+        # draw legal lines
+        if legal_lines:
+            canvas.drawString(left_x, 12*mm, legal_lines[0])
+        if len(legal_lines) > 1:
+            canvas.drawString(left_x, 9*mm, legal_lines[1])
+        # page number ("Seite X von Y") is added by _NumberedCanvas once the total is known
+        canvas.restoreState()
+
+    return _header_footer
+
+def _generate_results_pdf_report(payload, title="Prüfbericht: Automatisierte fachliche Prüfung (IFC-BIM)", mode="full"):
+    """
+    PDF report for a checked result. mode (see REPORT_MODES): "full" lists every
+    checked value, "failures" only the failed checks, "summary" only counts per object.
+    """
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, BaseDocTemplate, PageTemplate, Frame
+    styles = getSampleStyleSheet()
+
+    rows       = payload.get("rows") or []
+    standards  = payload.get("standards") or {}
+    ops_map    = payload.get("_ops") or {}
+    ranges_map = payload.get("_ranges") or {}
+    files      = payload.get("files") or []  # per-file summaries of a batch
+
+    total, ok_elems, fail_elems, missing_elems = _collect_summary(rows)
+
+    # Styles
+    h1 = styles['Title']; h1.fontName="Helvetica-Bold"; h1.fontSize=18; h1.leading=22
+    p  = styles['BodyText']; p.fontName="Helvetica"; p.fontSize=10.5; p.leading=14
+    small = styles['BodyText'].clone('small'); small.fontSize=9; small.leading=12; small.textColor=colors.HexColor("#555")
+
+    table_style = [
+        ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
+        ("FONTSIZE", (0,0), (-1,-1), 9),
+        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#F2F4F7")),
+        ("TEXTCOLOR", (0,0), (-1,0), colors.HexColor("#111111")),
+        ("LINEABOVE", (0,0), (-1,0), 0.75, colors.HexColor("#E5E7EB")),
+        ("LINEBELOW", (0,0), (-1,0), 0.75, colors.HexColor("#E5E7EB")),
+        ("GRID", (0,0), (-1,-1), 0.25, colors.HexColor("#E5E7EB")),
+        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+        ("LEFTPADDING", (0,0), (-1,-1), 4),
+        ("RIGHTPADDING", (0,0), (-1,-1), 4),
+        ("TOPPADDING", (0,0), (-1,-1), 3),
+        ("BOTTOMPADDING", (0,0), (-1,-1), 3),
+    ]
+    row_backgrounds = [colors.white, colors.HexColor("#FBFBFD")]
+
+    def _detail_table():
+        header = DETAIL_TABLE_HEADER
+        # --- column widths (points) ---
+        col_widths = [22*mm, 26*mm, 28*mm, 50*mm, 18*mm, 24*mm, 18*mm, 14*mm]
+
+        # --- truncate IFC-Typ with ellipsis to fit the column ---
+        ifc_col_idx = 1  # "IFC-Typ"
+        # Table paddings are ~4pt left + 4pt right -> subtract a bit
+        available_pt = col_widths[ifc_col_idx] - 8
+        def _prepare(row):
+            row[ifc_col_idx] = _fit_ellipsis(row[ifc_col_idx], available_pt, font_name="Helvetica", font_size=9)
+            return row
+
+        lines = _iter_detailed_table_rows(rows, standards, ops_map, ranges_map,
+                                          only_failures=(mode == "failures"))
+        style = table_style + [
+            ("ALIGN", (4,1), (5,-1), "RIGHT"),
+            ("ALIGN", (6,1), (7,-1), "CENTER"),
+        ]
+        return _ChunkedTable(header, lines, col_widths, style, row_backgrounds, prepare_row=_prepare)
+
+    def _files_table():
+        data = [["Datei", "Elemente", "konform", "nicht konform", "nicht bewertet"]]
+        for f in files:
+            name = _fit_ellipsis(f["filename"], 62*mm - 8, font_name="Helvetica", font_size=9)
+            if f.get("error"):
+                data.append([name, "Fehler beim Lesen", "", "", ""])
+            else:
+                data.append([name, f["total"], f["ok"], f["fail"], f["missing"]])
+        tbl = Table(data, repeatRows=1, colWidths=[62*mm, 28*mm, 26*mm, 28*mm, 30*mm])
+        tbl.setStyle(TableStyle(table_style + [
+            ("ALIGN", (1,1), (-1,-1), "RIGHT"),
+            ("ROWBACKGROUNDS", (0,1), (-1,-1), row_backgrounds),
+        ]))
+        return tbl
+
+    def _summary_table():
+        groups = {}
+        for r in rows:
+            groups.setdefault(r.get("Short") or "", []).append(r)
+        data = [["Objekt", "Elemente", "konform", "nicht konform", "nicht bewertet"]]
+        for short, items in groups.items():
+            n, ok, fail, missing = _collect_summary(items)
+            data.append([short, n, ok, fail, missing])
+        data.append(["Gesamt", total, ok_elems, fail_elems, missing_elems])
+        tbl = Table(data, repeatRows=1, colWidths=[50*mm, 30*mm, 30*mm, 30*mm, 30*mm])
+        tbl.setStyle(TableStyle(table_style + [
+            ("ALIGN", (1,1), (-1,-1), "RIGHT"),
+            ("ROWBACKGROUNDS", (0,1), (-1,-2), row_backgrounds),
+            ("FONTNAME", (0,-1), (-1,-1), "Helvetica-Bold"),
+            ("LINEABOVE", (0,-1), (-1,-1), 0.75, colors.HexColor("#E5E7EB")),
+        ]))
+        return tbl
+
+    def _build_story():
+        story = []
+        story.append(Paragraph(title, h1))
+        story.append(Spacer(1, 6))
+        story.append(Paragraph("Sehr geehrte Damen und Herren,", p))
+        story.append(Spacer(1, 4))
+        story.append(Paragraph(
+            f"Dieser Bericht fasst die Ergebnisse der automatisierten fachlichen Prüfung des IFC-Modells zusammen. "
+            f"Von insgesamt <b>{total}</b> geprüften Elementen erfüllen <b>{ok_elems}</b> die vorgegebenen Anforderungen. "
+            f"<b>{fail_elems}</b> Elemente erfüllen die Anforderungen nicht. "
+            f"Für <b>{missing_elems}</b> Elemente fehlen erforderliche Werte oder klare Vergleichsregeln.", p))
+        story.append(Spacer(1, 8))
+        story.append(Paragraph(
+            "Prüfgrundlage: Die automatischen Grenzwerte orientieren sich an den hinterlegten Normen/Regelwerken "
+            "im Adminbereich; die genaue rechtliche Bewertung obliegt der zuständigen Aufsichtsbehörde.", small))
+        story.append(Spacer(1, 10))
+
+        legend = Table([["Legende", "✓ = konform", "✗ = nicht konform", "– = nicht bewertet"]],
+                       style=TableStyle([
+                           ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
+                           ("FONTSIZE", (0,0), (-1,-1), 9),
+                           ("TEXTCOLOR", (0,0), (0,0), colors.HexColor("#111")),
+                           ("TEXTCOLOR", (1,0), (-1,0), colors.HexColor("#444")),
+                           ("BACKGROUND", (0,0), (0,0), colors.HexColor("#F2F4F7")),
+                           ("LINEABOVE", (0,0), (-1,0), 0.25, colors.HexColor("#E5E7EB")),
+                           ("LINEBELOW", (0,0), (-1,0), 0.25, colors.HexColor("#E5E7EB")),
+                           ("LEFTPADDING", (0,0), (-1,-1), 6),
+                           ("RIGHTPADDING", (0,0), (-1,-1), 6),
+                           ("TOPPADDING", (0,0), (-1,-1), 4),
+                           ("BOTTOMPADDING", (0,0), (-1,-1), 4),
+                       ]))
+        story.append(legend)
+        story.append(Spacer(1, 12))
+
+        if files:
+            story.append(Paragraph(f"Geprüfte Dateien ({len(files)}):", p))
+            story.append(Spacer(1, 6))
+            story.append(_files_table())
+            story.append(Spacer(1, 12))
+
+        if mode == "summary":
+            story.append(Paragraph("Zusammenfassung je Objekttyp (Detailtabelle ausgelassen):", p))
+            story.append(Spacer(1, 6))
+            story.append(_summary_table())
+        else:
+            if mode == "failures":
+                story.append(Paragraph("Aufgeführt sind nur die nicht konformen Prüfungen.", small))
+                story.append(Spacer(1, 6))
+            story.append(_detail_table())
+        story.append(Spacer(1, 12))
+        story.append(Paragraph("Mit freundlichen Grüßen", p))
+        story.append(Spacer(1, 14))
+        return story
+
+    # Single pass: _NumberedCanvas fills in the page total after layout
+    buf = BytesIO()
+    doc = BaseDocTemplate(buf, pagesize=A4,
+                          leftMargin=18*mm, rightMargin=18*mm,
+                          topMargin=30*mm, bottomMargin=26*mm)
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+    doc.addPageTemplates([
+        PageTemplate(id='All', frames=[frame], onPage=_make_header_footer())
+    ])
+    doc.build(_build_story(), canvasmaker=_NumberedCanvas)
+    buf.seek(0)
+    return buf
@@ -0,0 +1,66 @@
+"""The streaming extractor must return the same rows as the ifcopenshell path."""
+import os
+import re
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+ifcopenshell = pytest.importorskip("ifcopenshell")
+
+import checker  # noqa: E402
+from synthetic_ifc import write_synthetic_ifc  # noqa: E402
+
+def _reflow(src, dst):
+    """
+    Rewrite a model with the same content but the layouts other exporters use:
+    the first record on the DATA; line, two records per line, comments (with
+    ';' and quotes in them) after records, and a record split inside a string.
+    """
+    with open(src, encoding="ascii") as f:
+        text = f.read()
+    head, data = text.split("DATA;\n", 1)
+    records, tail = data.split("ENDSEC;\n", 1)
+    lines = records.splitlines()
+    out = []
+    for i in range(0, len(lines), 2):
+        pair = lines[i:i + 2]
+        if i % 6 == 0:
+            pair[0] += " /* note; 'quoted' */"
+        out.append("".join(pair))
+    # break one string literal across two lines
+    for i, line in enumerate(out):
+        m = re.search(r"'ID-Daten'", line)
+        if m:
+            out[i] = line[:m.start() + 3] + "\n" + line[m.start() + 3:]
+            break
+    with open(dst, "w", encoding="ascii", newline="\n") as f:
+        f.write(head + "/* exported by a test */ DATA;" + "\n".join(out) + "\nENDSEC;\n" + tail)
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("ifc")
+    plain, reflowed = str(tmp / "plain.ifc"), str(tmp / "reflowed.ifc")
+    write_synthetic_ifc(plain, 50, shared_pset_every=7)
+    _reflow(plain, reflowed)
+    return plain, reflowed
+
+def test_streaming_matches_ifcopenshell(models):
+    plain, _ = models
+    expected = checker.extract_id_daten_from_model(ifcopenshell.open(plain))
+    assert expected
+    assert checker.extract_id_daten_streaming(plain) == expected
+
+def test_streaming_handles_reflowed_records(models):
+    _, reflowed = models
+    expected = checker.extract_id_daten_from_model(ifcopenshell.open(reflowed))
+    assert expected
+    assert checker.extract_id_daten_streaming(reflowed) == expected
+
+def test_statements_split_outside_strings_and_comments():
+    lines = ["#1=IFCLABEL('a;b');#2=IFCLABEL('it''s');/* c; 'd */\n",
+             "#3=IFCLABEL('multi\n", "line');\n"]
+    assert list(checker._iter_step_statements(lines)) == [
+        "#1=IFCLABEL('a;b')", "#2=IFCLABEL('it''s')", "#3=IFCLABEL('multi\nline')"]